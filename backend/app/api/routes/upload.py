@@ -49,7 +49,7 @@ async def delete_uploaded_file(
     environment, you should track which user uploaded which files and
     verify ownership before deletion.
     """
-    success = delete_file(filename)
+    success = await delete_file(filename)
     
     if not success:
         raise HTTPException(
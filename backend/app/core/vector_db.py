@@ -1,6 +1,7 @@
 """Pinecone vector database utilities for SIRA."""
 import logging
 import os
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone, ServerlessSpec
 from llama_index.core import VectorStoreIndex, Document
@@ -33,6 +34,7 @@ class PineconeManager:
         
         self.pc = Pinecone(**pc_kwargs)
         self.index_name = settings.pinecone_index_name
+        self._index = None
         self.embedding_model = MistralAIEmbedding(
             api_key=settings.mistral_api_key,
             model_name=settings.mistral_embedding_model
@@ -74,8 +76,10 @@ class PineconeManager:
             raise
     
     def get_index(self):
-        """Get Pinecone index instance."""
-        return self.pc.Index(self.index_name)
+        """Get Pinecone index instance, reusing one handle and its connections."""
+        if self._index is None:
+            self._index = self.pc.Index(self.index_name)
+        return self._index
     
     def get_vector_store(self) -> PineconeVectorStore:
         """
@@ -118,7 +122,8 @@ class PineconeManager:
         self,
         query_text: str,
         filters: Optional[Dict[str, Any]] = None,
-        top_k: int = 5
+        top_k: int = 5,
+        embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Query vector database with optional metadata filters.
@@ -127,13 +132,16 @@ class PineconeManager:
             query_text: Search query
             filters: Metadata filters (e.g., {"university": "UM6P"})
             top_k: Number of results to return
+            embedding: Precomputed embedding of query_text, if available
             
         Returns:
             List of matching documents with scores
         """
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.get_text_embedding(query_text)
+            # Generate query embedding unless the caller already has one
+            query_embedding = embedding
+            if query_embedding is None:
+                query_embedding = self.embedding_model.get_text_embedding(query_text)
             
             # Query Pinecone
             index = self.get_index()
@@ -192,10 +200,7 @@ class PineconeManager:
             raise
 
 
-# Singleton instance
-_pinecone_manager: Optional[PineconeManager] = None
-
-
+@lru_cache(maxsize=1)
 def get_pinecone_manager() -> PineconeManager:
     """
     Get or create singleton PineconeManager instance.
@@ -203,7 +208,4 @@ def get_pinecone_manager() -> PineconeManager:
     Returns:
         PineconeManager instance
     """
-    global _pinecone_manager
-    if _pinecone_manager is None:
-        _pinecone_manager = PineconeManager()
-    return _pinecone_manager
+    return PineconeManager()
@@ -1,10 +1,14 @@
 """Database engine and session management with connection pooling."""
+import hashlib
 import logging
 from collections.abc import Iterator
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine, event
+from sqlalchemy import Column, MetaData, String, Table, create_engine, delete, event, insert, inspect, select
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import NullPool, StaticPool
 
 from app.core.config import get_settings
 
@@ -12,24 +16,67 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Bookkeeping table for ensure_schema(); kept off Base.metadata so it is not
+# part of the application schema or Alembic autogenerate
+_SCHEMA_VERSION = Table(
+    "_schema_version",
+    MetaData(),
+    Column("schema_key", String(64), primary_key=True),
+)
+
 
 def _engine_url() -> str:
     return get_settings().database_url
 
 
-def get_engine():
+def _test_engine(url: str) -> Engine:
+    """
+    Build an engine tuned for short-lived test runs.
+    
+    SQLite keeps a single connection (StaticPool) so an in-memory database
+    survives across sessions. Other databases open connections on demand
+    (NullPool) without a pre-ping, since tests hold each one only briefly.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return create_engine(
+            url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+    return create_engine(
+        url,
+        poolclass=NullPool,
+        pool_pre_ping=False,
+        connect_args={"connect_timeout": 10},
+    )
+
+
+def get_engine(test: bool = False):
     """
     Get database engine with optimized connection pooling.
     
+    Pass test=True for the lightweight pooling used by test modules.
+    
     Configuration:
     - pool_pre_ping: Verify connections before using (prevents stale connections)
     - pool_size: Maintain 10 connections in the pool
     - max_overflow: Allow up to 20 additional connections
     - pool_recycle: Recycle connections after 1 hour
     - pool_timeout: Wait 30 seconds for available connection
+    - executemany_mode (psycopg2 only): batch executemany UPDATE/DELETE as
+      well as INSERT, so bulk writes are not issued row by row
     """
+    url = _engine_url()
+    if test:
+        return _test_engine(url)
+    
+    driver_kwargs = {}
+    if make_url(url).get_driver_name() == "psycopg2":
+        driver_kwargs["executemany_mode"] = "values_plus_batch"
+        driver_kwargs["insertmanyvalues_page_size"] = 1000
+    
     engine = create_engine(
-        _engine_url(),
+        url,
         pool_pre_ping=True,
         pool_size=10,
         max_overflow=20,
@@ -39,6 +86,7 @@ def get_engine():
         connect_args={
             "connect_timeout": 10,
         },
+        **driver_kwargs,
     )
     
     # Log connection pool events in debug mode
@@ -50,7 +98,7 @@ def get_engine():
 
 
 @contextmanager
-def session_scope() -> Iterator[Session]:
+def session_scope(readonly: bool = False) -> Iterator[Session]:
     """
     Provide a transactional scope around a series of operations.
     
@@ -60,17 +108,67 @@ def session_scope() -> Iterator[Session]:
             session.add(obj)
             # commit happens automatically on success
             # rollback happens automatically on exception
+    
+    With readonly=True the transaction is rolled back instead of committed,
+    which skips the COMMIT round-trip for sessions that only read.
     """
     engine = get_engine()
     with Session(engine) as session:
         try:
             yield session
-            session.commit()
+            if readonly:
+                session.rollback()
+            else:
+                session.commit()
         except Exception:
             session.rollback()
             raise
 
 
+def schema_key() -> str:
+    """Return a stable hash of the tables and columns declared on Base."""
+    shape = sorted(
+        (table.name, tuple((column.name, repr(column.type)) for column in table.columns))
+        for table in Base.metadata.tables.values()
+    )
+    return hashlib.sha256(repr(shape).encode()).hexdigest()
+
+
+def _stored_schema_key(conn: Connection) -> str | None:
+    try:
+        # SAVEPOINT so a missing table does not abort the outer transaction
+        with conn.begin_nested():
+            return conn.execute(select(_SCHEMA_VERSION.c.schema_key)).scalar_one_or_none()
+    except DBAPIError:
+        return None
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """
+    Run Base.metadata.create_all() only when the declared schema changed.
+    
+    create_all() reflects every table before issuing DDL, which costs many
+    round-trips even when nothing is missing. The schema key of the last
+    successful run is stored in the database; a matching key skips it, as
+    long as every declared table still exists (one catalog query), so a
+    dropped or downgraded schema is recreated.
+    
+    Returns:
+        True if create_all() ran, False if the schema was already current
+    """
+    key = schema_key()
+    with engine.begin() as conn:
+        if _stored_schema_key(conn) == key:
+            existing = set(inspect(conn).get_table_names())
+            if existing.issuperset(Base.metadata.tables):
+                return False
+        Base.metadata.create_all(conn)
+        _SCHEMA_VERSION.create(conn, checkfirst=True)
+        conn.execute(delete(_SCHEMA_VERSION))
+        conn.execute(insert(_SCHEMA_VERSION).values(schema_key=key))
+    return True
+
+
 def init_db() -> None:
     """
     Create database tables if they do not exist.
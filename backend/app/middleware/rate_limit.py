@@ -1,22 +1,27 @@
 """Rate limiting middleware for API protection."""
 import time
 from collections import defaultdict
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
 from fastapi import HTTPException, Request, Response, status
 from starlette.middleware.base import BaseHTTPMiddleware
 
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
-    Simple in-memory rate limiting middleware.
+    Rate limiting middleware with an in-memory or Redis-backed store.
     
-    For production, consider using Redis-backed rate limiting like slowapi
-    with Redis backend for distributed systems.
+    Without Redis, request timestamps are kept per process. With a Redis
+    client, each IP gets fixed-window minute and hour counters shared by
+    every worker.
     
     Configuration:
     - requests_per_minute: Number of requests allowed per IP per minute
     - requests_per_hour: Number of requests allowed per IP per hour
+    - redis: Optional async Redis client for distributed counters
     """
 
     def __init__(
@@ -25,11 +30,13 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
         exclude_paths: list[str] | None = None,
+        redis: "Redis | None" = None,
     ):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
         self.exclude_paths = exclude_paths or ["/health", "/", "/docs", "/openapi.json"]
+        self.redis = redis
         
         # Store request timestamps per IP
         # Format: {ip: [(timestamp, 'minute'|'hour')]}
@@ -96,6 +103,59 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         return False, ""
 
+    async def _increment_counters(self, ip: str) -> tuple[int, int]:
+        """
+        Record a request in the Redis fixed-window counters.
+        
+        Returns:
+            tuple: (minute_count: int, hour_count: int) including this request
+        """
+        current_time = int(time.time())
+        minute_key = f"rl:m:{ip}:{current_time // 60}"
+        hour_key = f"rl:h:{ip}:{current_time // 3600}"
+        
+        # One round-trip; INCR is atomic, so concurrent workers never race
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(minute_key)
+            pipe.expire(minute_key, 60)
+            pipe.incr(hour_key)
+            pipe.expire(hour_key, 3600)
+            minute_count, _, hour_count, _ = await pipe.execute()
+        
+        return minute_count, hour_count
+
+    async def _dispatch_redis(
+        self, request: Request, call_next: Callable, client_ip: str
+    ) -> Response:
+        """Enforce rate limits using the Redis counters."""
+        minute_count, hour_count = await self._increment_counters(client_ip)
+        
+        if minute_count > self.requests_per_minute:
+            reason = f"Rate limit exceeded: {self.requests_per_minute} requests per minute"
+        elif hour_count > self.requests_per_hour:
+            reason = f"Rate limit exceeded: {self.requests_per_hour} requests per hour"
+        else:
+            reason = ""
+        if reason:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=reason,
+                headers={"Retry-After": "60"},
+            )
+        
+        response = await call_next(request)
+        
+        response.headers["X-RateLimit-Limit-Minute"] = str(self.requests_per_minute)
+        response.headers["X-RateLimit-Remaining-Minute"] = str(
+            max(0, self.requests_per_minute - minute_count)
+        )
+        response.headers["X-RateLimit-Limit-Hour"] = str(self.requests_per_hour)
+        response.headers["X-RateLimit-Remaining-Hour"] = str(
+            max(0, self.requests_per_hour - hour_count)
+        )
+        
+        return response
+
     async def dispatch(
         self, request: Request, call_next: Callable
     ) -> Response:
@@ -107,6 +167,9 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Get client IP
         client_ip = self._get_client_ip(request)
         
+        if self.redis is not None:
+            return await self._dispatch_redis(request, call_next, client_ip)
+        
         # Check rate limit
         is_limited, reason = self._is_rate_limited(client_ip)
         if is_limited:
@@ -2,7 +2,7 @@
 from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session, joinedload
 
 from app.models.profile import Profile, AcademicRecord, StudentPreferences, SubjectGrade
@@ -145,6 +145,22 @@ def create_subject_grade(
     return subject_grade
 
 
+def create_subject_grades(
+    session: Session,
+    academic_record_id: UUID,
+    subject_grades: list[dict]
+) -> None:
+    """Create several subject grades with one multi-row INSERT."""
+    if not subject_grades:
+        return
+    
+    session.execute(
+        insert(SubjectGrade),
+        [{**grade, "academic_record_id": academic_record_id} for grade in subject_grades]
+    )
+    session.commit()
+
+
 def delete_subject_grades(session: Session, academic_record_id: UUID) -> None:
     """Delete all subject grades for an academic record."""
     subject_grades = session.execute(
@@ -1,6 +1,6 @@
 """Profile-related Pydantic schemas for API requests and responses."""
 from datetime import datetime
-from typing import Any, Optional
+from typing import Annotated, Any, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
@@ -9,11 +9,16 @@ from app.utils.validation import (
     sanitize_string,
     sanitize_html,
     validate_url,
-    validate_gpa,
-    validate_grade,
 )
 
 
+# Numeric ranges are enforced by pydantic-core at parse time rather than by
+# Python-level field validators.
+Grade = Annotated[float, Field(ge=0.0, le=100.0)]
+Gpa = Annotated[float, Field(ge=0.0, le=20.0)]
+Weight = Annotated[float, Field(ge=0.0)]
+
+
 # ============================================================================
 # Subject Grade Schemas
 # ============================================================================
@@ -21,8 +26,8 @@ from app.utils.validation import (
 class SubjectGradeCreate(BaseModel):
     """Schema for creating a subject grade."""
     subject_name: str = Field(..., max_length=255, description="Subject/course name")
-    grade: float = Field(..., ge=0.0, le=100.0, description="Numeric grade (0-100 scale)")
-    weight: Optional[float] = Field(None, ge=0.0, description="Subject weight/credit hours")
+    grade: Grade = Field(..., description="Numeric grade (0-100 scale)")
+    weight: Optional[Weight] = Field(None, description="Subject weight/credit hours")
 
     @field_validator("subject_name")
     @classmethod
@@ -33,26 +38,12 @@ class SubjectGradeCreate(BaseModel):
             raise ValueError("Subject name cannot be empty")
         return sanitized
 
-    @field_validator("grade")
-    @classmethod
-    def validate_grade_value(cls, v: float) -> float:
-        """Validate grade is in acceptable range."""
-        return validate_grade(v, min_value=0.0, max_value=100.0) or 0.0
-
-    @field_validator("weight")
-    @classmethod
-    def validate_weight_value(cls, v: Optional[float]) -> Optional[float]:
-        """Validate weight is non-negative."""
-        if v is not None and v < 0:
-            raise ValueError("Weight cannot be negative")
-        return v
-
 
 class SubjectGradeUpdate(BaseModel):
     """Schema for updating a subject grade."""
     subject_name: Optional[str] = Field(None, max_length=255)
-    grade: Optional[float] = Field(None, ge=0.0, le=100.0)
-    weight: Optional[float] = Field(None, ge=0.0)
+    grade: Optional[Grade] = None
+    weight: Optional[Weight] = None
 
 
 class SubjectGradeResponse(BaseModel):
@@ -75,7 +66,7 @@ class AcademicRecordCreate(BaseModel):
     current_status: Optional[str] = Field(None, max_length=100, description="Educational status")
     current_institution: Optional[str] = Field(None, max_length=255, description="Institution name")
     current_field: Optional[str] = Field(None, max_length=255, description="Field of study")
-    gpa: Optional[float] = Field(None, ge=0.0, le=20.0, description="GPA (0-20 scale)")
+    gpa: Optional[Gpa] = Field(None, description="GPA (0-20 scale)")
     transcript_url: Optional[str] = Field(None, max_length=500, description="Transcript URL")
     language_preference: Optional[str] = Field(None, max_length=50, description="Language preference")
     subject_grades: Optional[list[SubjectGradeCreate]] = Field(default_factory=list)
@@ -86,12 +77,6 @@ class AcademicRecordCreate(BaseModel):
         """Sanitize text fields."""
         return sanitize_string(v, max_length=255)
 
-    @field_validator("gpa")
-    @classmethod
-    def validate_gpa_value(cls, v: Optional[float]) -> Optional[float]:
-        """Validate GPA is in acceptable range."""
-        return validate_gpa(v, min_value=0.0, max_value=20.0)
-
     @field_validator("transcript_url")
     @classmethod
     def validate_transcript_url(cls, v: Optional[str]) -> Optional[str]:
@@ -109,7 +94,7 @@ class AcademicRecordUpdate(BaseModel):
     current_status: Optional[str] = Field(None, max_length=100)
     current_institution: Optional[str] = Field(None, max_length=255)
     current_field: Optional[str] = Field(None, max_length=255)
-    gpa: Optional[float] = Field(None, ge=0.0, le=20.0)
+    gpa: Optional[Gpa] = None
     transcript_url: Optional[str] = Field(None, max_length=500)
     language_preference: Optional[str] = Field(None, max_length=50)
 
@@ -137,7 +137,7 @@ Guidelines:
             messages.append({"role": "user", "content": user_message})
             
             # Get response from Mistral
-            response = self.client.chat.complete(
+            response = await self.client.chat.complete_async(
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
@@ -189,7 +189,7 @@ Guidelines:
             logger.info(f"Starting stream with {len(messages)} messages in context")
             
             # Stream from Mistral
-            stream = self.client.chat.stream(
+            stream = await self.client.chat.stream_async(
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
@@ -197,7 +197,7 @@ Guidelines:
             )
             
             chunk_count = 0
-            for chunk in stream:
+            async for chunk in stream:
                 if chunk.data.choices and chunk.data.choices[0].delta.content:
                     chunk_count += 1
                     if chunk_count == 1:
@@ -60,13 +60,12 @@ def create_profile(
             **academic_dict
         )
         
-        # Create subject grades
-        for subject_data in subject_grades_data:
-            profile_repository.create_subject_grade(
-                session=session,
-                academic_record_id=academic_record.id,
-                **subject_data.model_dump()
-            )
+        # Create subject grades in a single round-trip
+        profile_repository.create_subject_grades(
+            session=session,
+            academic_record_id=academic_record.id,
+            subject_grades=[subject_data.model_dump() for subject_data in subject_grades_data]
+        )
     
     # Create preferences if provided
     if profile_data.preferences:
@@ -189,12 +188,11 @@ def add_subject_grades(
     subject_grades: list[SubjectGradeCreate]
 ) -> AcademicRecord:
     """Add multiple subject grades to an academic record."""
-    for subject_data in subject_grades:
-        profile_repository.create_subject_grade(
-            session=session,
-            academic_record_id=academic_record_id,
-            **subject_data.model_dump()
-        )
+    profile_repository.create_subject_grades(
+        session=session,
+        academic_record_id=academic_record_id,
+        subject_grades=[subject_data.model_dump() for subject_data in subject_grades]
+    )
     
     # Return updated academic record
     return session.get(AcademicRecord, academic_record_id)
@@ -1,11 +1,42 @@
 """Query construction service for converting profiles to search queries."""
 
-from typing import Dict, List, Optional
+import copy
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from app.models.profile import Profile
 
 
+def _profile_version(profile: Profile) -> Tuple[Optional[UUID], str]:
+    """Identify a profile revision by its id and last update timestamp."""
+    updated_at = profile.updated_at.isoformat() if profile.updated_at else ""
+    return profile.id, updated_at
+
+
+def _query_signature(profile: Profile) -> Tuple:
+    """Collect the profile fields profile_to_query reads, as a hashable tuple."""
+    ar = profile.academic_record
+    prefs = profile.preferences
+    return (
+        (ar.current_field, ar.current_status) if ar else None,
+        (
+            tuple(prefs.favorite_subjects or ()),
+            prefs.career_goals,
+        ) if prefs else None,
+    )
+
+
+def _filters_signature(profile: Profile) -> Tuple:
+    """Collect the profile fields build_metadata_filters reads, as a hashable tuple."""
+    ar = profile.academic_record
+    prefs = profile.preferences
+    return (
+        (ar.gpa, ar.language_preference) if ar else None,
+        (prefs.budget_range_max, prefs.geographic_preference) if prefs else None,
+    )
+
+
 def profile_to_query(profile: Profile) -> str:
     """
     Convert a student profile into a semantic search query.
@@ -19,33 +50,47 @@ def profile_to_query(profile: Profile) -> str:
     Returns:
         Natural language search query string
     """
+    # The pipeline builds the query several times per profile (query
+    # construction, retrieval, generation); the cache is keyed on the
+    # profile revision and the fields read, so edits never hit stale entries
+    return _profile_to_query_cached(*_profile_version(profile), _query_signature(profile))
+
+
+@lru_cache(maxsize=512)
+def _profile_to_query_cached(
+    profile_id: Optional[UUID],
+    updated_at: str,
+    signature: Tuple,
+) -> str:
+    """Build the semantic query from the fields captured in the signature."""
+    academic, prefs = signature
     query_parts = []
     
     # Academic field and current status
-    if profile.academic_record:
-        ar = profile.academic_record
+    if academic:
+        current_field, current_status = academic
         
-        if ar.current_field:
-            query_parts.append(f"Programs in {ar.current_field}")
+        if current_field:
+            query_parts.append(f"Programs in {current_field}")
         
-        if ar.current_status:
+        if current_status:
             status_map = {
                 "high_school": "for high school graduates",
                 "undergrad": "for undergraduate students",
                 "career_switcher": "for career transition"
             }
-            query_parts.append(status_map.get(ar.current_status, ""))
+            query_parts.append(status_map.get(current_status, ""))
     
     # Student interests and preferences
-    if profile.preferences:
-        prefs = profile.preferences
+    if prefs:
+        favorite_subjects, career_goals = prefs
         
-        if prefs.favorite_subjects:
-            subjects = ", ".join(prefs.favorite_subjects[:3])  # Top 3
+        if favorite_subjects:
+            subjects = ", ".join(favorite_subjects[:3])  # Top 3
             query_parts.append(f"with focus on {subjects}")
         
-        if prefs.career_goals:
-            query_parts.append(f"leading to careers in {prefs.career_goals}")
+        if career_goals:
+            query_parts.append(f"leading to careers in {career_goals}")
     
     # Construct final query
     query = " ".join(filter(None, query_parts))
@@ -69,28 +114,43 @@ def build_metadata_filters(profile: Profile) -> Dict:
     Returns:
         Dictionary of Pinecone filter conditions
     """
+    # Callers get their own copy, since the cached dict is shared
+    return copy.deepcopy(
+        _build_metadata_filters_cached(*_profile_version(profile), _filters_signature(profile))
+    )
+
+
+@lru_cache(maxsize=512)
+def _build_metadata_filters_cached(
+    profile_id: Optional[UUID],
+    updated_at: str,
+    signature: Tuple,
+) -> Dict:
+    """Build the Pinecone filters from the fields captured in the signature."""
+    academic, prefs = signature
+    gpa, language_preference = academic or (None, None)
     filters = {}
     
-    if profile.academic_record and profile.academic_record.gpa:
+    if gpa:
         # Only show programs where student meets minimum GPA
         # Using $gte because we want programs with min_gpa <= student's GPA
-        filters["min_gpa"] = {"$lte": float(profile.academic_record.gpa)}
+        filters["min_gpa"] = {"$lte": float(gpa)}
     
-    if profile.preferences:
-        prefs = profile.preferences
+    if prefs:
+        budget_range_max, geographic_preference = prefs
         
         # Budget constraint (tuition fee must be <= student's max budget)
-        if prefs.budget_range_max:
-            filters["tuition_fee_mad"] = {"$lte": prefs.budget_range_max}
+        if budget_range_max:
+            filters["tuition_fee_mad"] = {"$lte": budget_range_max}
         
         # Geographic preference
-        if prefs.geographic_preference:
+        if geographic_preference:
             # Exact match or contains (depending on how data is stored)
-            filters["location"] = {"$eq": prefs.geographic_preference}
+            filters["location"] = {"$eq": geographic_preference}
         
         # Language preference (if stored in preferences)
-        if profile.academic_record and profile.academic_record.language_preference:
-            lang = profile.academic_record.language_preference
+        if language_preference:
+            lang = language_preference
             if lang in ["French", "English", "Arabic"]:
                 filters["language"] = {"$eq": lang}
     
@@ -1,6 +1,9 @@
 """RAG retrieval service for finding relevant academic programs."""
 
-from typing import Dict, List, Optional
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from app.core.vector_db import get_pinecone_manager
@@ -8,11 +11,50 @@ from app.models.profile import Profile
 from app.services.query_service import build_metadata_filters, enhance_query_with_context, profile_to_query
 from app.schemas.recommendation import RetrievedProgram
 
+# Query embeddings are reused for a few minutes, since the same profile is
+# usually retrieved several times in a row (strict, relaxed, fallback)
+_EMBEDDING_TTL_SECONDS = 300
+_EMBEDDING_CACHE_SIZE = 256
+_embedding_cache: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+
+
+async def embed_queries_batch(queries: List[str]) -> List[List[float]]:
+    """
+    Embed query texts, fetching every uncached text in one Mistral request.
+    
+    Args:
+        queries: Query texts to embed
+        
+    Returns:
+        One embedding per query, in the same order
+    """
+    now = time.monotonic()
+    found: Dict[str, List[float]] = {}
+    for query in queries:
+        entry = _embedding_cache.get(query)
+        if entry is not None and now - entry[0] < _EMBEDDING_TTL_SECONDS:
+            _embedding_cache.move_to_end(query)
+            found[query] = entry[1]
+    
+    missing = [query for query in dict.fromkeys(queries) if query not in found]
+    if missing:
+        manager = get_pinecone_manager()
+        vectors = await manager.embedding_model.aget_text_embedding_batch(missing)
+        for query, vector in zip(missing, vectors):
+            found[query] = vector
+            _embedding_cache[query] = (now, vector)
+            _embedding_cache.move_to_end(query)
+        while len(_embedding_cache) > _EMBEDDING_CACHE_SIZE:
+            _embedding_cache.popitem(last=False)
+    
+    return [found[query] for query in queries]
+
 
 async def retrieve_relevant_programs(
     profile: Profile,
     top_k: int = 5,
-    enhance_query: bool = True
+    enhance_query: bool = True,
+    embedding: Optional[List[float]] = None
 ) -> List[RetrievedProgram]:
     """
     Retrieve relevant academic programs using hybrid search (semantic + metadata filtering).
@@ -27,6 +69,7 @@ async def retrieve_relevant_programs(
         profile: Student profile to generate recommendations for
         top_k: Number of programs to retrieve (default: 5)
         enhance_query: Whether to enhance query with additional context
+        embedding: Precomputed embedding of the (enhanced) query text
         
     Returns:
         List of retrieved programs with relevance scores
@@ -42,12 +85,18 @@ async def retrieve_relevant_programs(
     # Step 2: Build metadata filters for hard constraints
     filters = build_metadata_filters(profile)
     
-    # Step 3: Query Pinecone
+    # Step 3: Embed the query (cached) and query Pinecone; the Pinecone
+    # call is blocking HTTP, so keep it off the event loop
+    if embedding is None:
+        [embedding] = await embed_queries_batch([query_text])
+    
     manager = get_pinecone_manager()
-    results = manager.query(
+    results = await asyncio.to_thread(
+        manager.query,
         query_text=query_text,
         filters=filters if filters else None,
-        top_k=top_k
+        top_k=top_k,
+        embedding=embedding
     )
     
     # Step 4: Convert to schema objects
@@ -67,7 +116,8 @@ async def retrieve_relevant_programs(
 
 async def retrieve_with_fallback(
     profile: Profile,
-    top_k: int = 5
+    top_k: int = 5,
+    embedding: Optional[List[float]] = None
 ) -> tuple[List[RetrievedProgram], str]:
     """
     Retrieve programs with fallback strategy if no results found.
@@ -80,12 +130,14 @@ async def retrieve_with_fallback(
     Args:
         profile: Student profile
         top_k: Number of programs to retrieve
+        embedding: Precomputed embedding of the enhanced query text, reused
+            by the filtered attempts
         
     Returns:
         Tuple of (retrieved programs, strategy used)
     """
     # Try with all filters
-    programs = await retrieve_relevant_programs(profile, top_k=top_k)
+    programs = await retrieve_relevant_programs(profile, top_k=top_k, embedding=embedding)
     
     if programs:
         return programs, "full_constraints"
@@ -94,9 +146,10 @@ async def retrieve_with_fallback(
     if profile.preferences and profile.preferences.budget_range_max:
         original_budget = profile.preferences.budget_range_max
         profile.preferences.budget_range_max = None  # Remove budget filter
-        
-        programs = await retrieve_relevant_programs(profile, top_k=top_k)
-        profile.preferences.budget_range_max = original_budget  # Restore
+        try:
+            programs = await retrieve_relevant_programs(profile, top_k=top_k, embedding=embedding)
+        finally:
+            profile.preferences.budget_range_max = original_budget  # Restore
         
         if programs:
             return programs, "relaxed_budget"
@@ -104,8 +157,15 @@ async def retrieve_with_fallback(
     # Fallback 2: Remove all filters (semantic only)
     # Create a temporary profile with no constraints
     query_text = profile_to_query(profile)
+    [query_embedding] = await embed_queries_batch([query_text])
     manager = get_pinecone_manager()
-    results = manager.query(query_text=query_text, filters=None, top_k=top_k)
+    results = await asyncio.to_thread(
+        manager.query,
+        query_text=query_text,
+        filters=None,
+        top_k=top_k,
+        embedding=query_embedding
+    )
     
     programs = [
         RetrievedProgram(
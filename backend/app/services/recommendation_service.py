@@ -1,8 +1,11 @@
 """Main recommendation generation service with LLM integration."""
 
+import asyncio
+import io
 import logging
-from typing import AsyncGenerator, Dict, List, Optional, Tuple
-from uuid import UUID
+import threading
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
 from mistralai import Mistral
 
@@ -23,6 +26,67 @@ from app.services.query_service import profile_to_query
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# System message shared by every LLM call; treated as read-only
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def _build_messages(user_prompt: str) -> List[Dict[str, str]]:
+    """Build the chat messages for a recommendation request."""
+    return [_SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}]
+
+
+# Program content is truncated to this many characters when stored as context
+_CONTEXT_CONTENT_LIMIT = 500
+
+# Metadata keys kept in stored context; vector-store bookkeeping fields are dropped
+_CONTEXT_METADATA_KEYS = frozenset({
+    "degree_type",
+    "field",
+    "location",
+    "tuition_fee_mad",
+    "language",
+    "min_gpa",
+    "admission_rate",
+    "duration_years",
+})
+
+
+def _programs_to_context(programs: List[RetrievedProgram]) -> List[Dict]:
+    """Convert retrieved programs to the JSON-serializable context stored with a recommendation."""
+    context = []
+    for p in programs:
+        content = p.content
+        if len(content) > _CONTEXT_CONTENT_LIMIT:
+            content = content[:_CONTEXT_CONTENT_LIMIT]
+        context.append({
+            "university": p.university,
+            "program_name": p.program_name,
+            "score": p.score,
+            "metadata": {k: v for k, v in p.metadata.items() if k in _CONTEXT_METADATA_KEYS},
+            "content": content,
+        })
+    return context
+
+
+def _insert_recommendation(recommendation_data: Dict[str, Any]) -> Recommendation:
+    """
+    Insert a recommendation row in its own transaction (blocking).
+    
+    Returns the saved row detached, with the server-assigned created_at loaded.
+    """
+    with session_scope() as db:
+        recommendation = Recommendation(**recommendation_data)
+        db.add(recommendation)
+        db.flush()
+        db.refresh(recommendation)
+        # Detach so the commit at the end of the scope does not expire it
+        db.expunge(recommendation)
+    logger.info(
+        f"Saved recommendation {recommendation.id} "
+        f"for session {recommendation.session_id}"
+    )
+    return recommendation
+
 
 class RecommendationService:
     """Service for generating AI-powered academic recommendations."""
@@ -54,6 +118,9 @@ class RecommendationService:
         6. Parse and structure response
         7. Save to database with session_id linkage
         
+        The insert is awaited before returning, since callers hand the id to
+        clients that read the recommendation back; it still runs off the loop.
+        
         Args:
             profile_id: UUID of the student profile
             session_id: UUID of the conversation session
@@ -104,33 +171,18 @@ class RecommendationService:
         structured_data = parse_json_from_response(ai_response)
         
         # Convert programs to JSON-serializable format
-        retrieved_context = [
-            {
-                "university": p.university,
-                "program_name": p.program_name,
-                "score": p.score,
-                "metadata": p.metadata,
-                "content": p.content[:500]  # Truncate for storage
-            }
-            for p in programs
-        ]
+        retrieved_context = _programs_to_context(programs)
         
         # Step 7: Save to database with session_id
-        with session_scope() as db:
-            recommendation = Recommendation(
-                profile_id=profile_id,
-                session_id=session_id,  # REQUIRED: Link to conversation session
-                query=query_text,
-                retrieved_context=retrieved_context,
-                ai_response=ai_response,
-                structured_data=structured_data
-            )
-            db.add(recommendation)
-            db.commit()
-            db.refresh(recommendation)
-            
-            logger.info(f"Saved recommendation {recommendation.id} for session {session_id}")
-            return recommendation
+        return await asyncio.to_thread(_insert_recommendation, {
+            "id": uuid4(),
+            "profile_id": profile_id,
+            "session_id": session_id,  # REQUIRED: Link to conversation session
+            "query": query_text,
+            "retrieved_context": retrieved_context,
+            "ai_response": ai_response,
+            "structured_data": structured_data,
+        })
     
     async def _call_llm(self, user_prompt: str) -> str:
         """
@@ -143,12 +195,9 @@ class RecommendationService:
             LLM response text
         """
         try:
-            response = self.client.chat.complete(
+            response = await self.client.chat.complete_async(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=_build_messages(user_prompt),
                 temperature=0.7,
                 max_tokens=2000
             )
@@ -212,24 +261,21 @@ class RecommendationService:
             user_prompt += conversation_context
             user_prompt += "\n\nBased on this conversation, refine your recommendations to address the student's specific questions and interests."
         
-        # Step 5: Stream LLM response
-        full_response = []
+        # Step 5: Stream LLM response, accumulating into a single text buffer
+        full_response = io.StringIO()
         
         try:
-            stream = self.client.chat.stream(
+            stream = await self.client.chat.stream_async(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=_build_messages(user_prompt),
                 temperature=0.7,
                 max_tokens=2000
             )
             
-            for chunk in stream:
+            async for chunk in stream:
                 if chunk.data.choices[0].delta.content:
                     content = chunk.data.choices[0].delta.content
-                    full_response.append(content)
+                    full_response.write(content)
                     yield content
         
         except Exception as e:
@@ -237,32 +283,22 @@ class RecommendationService:
             raise RuntimeError(f"Failed to stream recommendation: {str(e)}")
         
         # Step 6-7: Save after streaming completes with session_id
-        ai_response = "".join(full_response)
+        ai_response = full_response.getvalue()
         structured_data = parse_json_from_response(ai_response)
+        retrieved_context = _programs_to_context(programs)
         
-        retrieved_context = [
-            {
-                "university": p.university,
-                "program_name": p.program_name,
-                "score": p.score,
-                "metadata": p.metadata,
-                "content": p.content[:500]
-            }
-            for p in programs
-        ]
-        
-        with session_scope() as db:
-            recommendation = Recommendation(
-                profile_id=profile_id,
-                session_id=session_id,  # REQUIRED: Link to conversation session
-                query=query_text,
-                retrieved_context=retrieved_context,
-                ai_response=ai_response,
-                structured_data=structured_data
-            )
-            db.add(recommendation)
-            db.commit()
-            logger.info(f"Saved streamed recommendation {recommendation.id} for session {session_id}")
+        # The last chunk has already been yielded. The insert is awaited rather
+        # than scheduled because callers read the session's latest
+        # recommendation once the stream is exhausted; it still runs off the loop.
+        await asyncio.to_thread(_insert_recommendation, {
+            "id": uuid4(),
+            "profile_id": profile_id,
+            "session_id": session_id,  # REQUIRED: Link to conversation session
+            "query": query_text,
+            "retrieved_context": retrieved_context,
+            "ai_response": ai_response,
+            "structured_data": structured_data,
+        })
     
     def get_recommendations_by_profile(
         self,
@@ -279,19 +315,24 @@ class RecommendationService:
         Returns:
             List of recommendations, newest first
         """
-        with session_scope() as db:
-            return (
-                db.query(Recommendation)
-                .filter(Recommendation.profile_id == profile_id)
-                .order_by(Recommendation.created_at.desc())
-                .limit(limit)
-                .all()
-            )
+        with session_scope(readonly=True) as db:
+            recommendations = recommendation_repository.get_by_profile_id(db, profile_id, limit)
+            # Detach so the loaded rows stay readable once the scope ends
+            db.expunge_all()
+            return recommendations
     
     def get_recommendation_by_id(self, recommendation_id: UUID) -> Optional[Recommendation]:
-        """Get a specific recommendation by ID."""
-        with session_scope() as db:
-            return db.query(Recommendation).filter(Recommendation.id == recommendation_id).first()
+        """
+        Get a specific recommendation by ID.
+        
+        retrieved_context and structured_data are JSONB columns, so the single
+        primary-key SELECT already carries them and no lazy load follows.
+        """
+        with session_scope(readonly=True) as db:
+            recommendation = db.get(Recommendation, recommendation_id)
+            # Detach so the loaded row stays readable once the scope ends
+            db.expunge_all()
+            return recommendation
     
     def submit_feedback(
         self,
@@ -322,6 +363,8 @@ class RecommendationService:
             recommendation.feedback_comment = comment
             db.commit()
             db.refresh(recommendation)
+            # Detach so the commit at the end of the scope does not expire it
+            db.expunge(recommendation)
             
             logger.info(f"Updated feedback for recommendation {recommendation_id}")
             return recommendation
@@ -329,11 +372,20 @@ class RecommendationService:
 
 # Singleton instance
 _recommendation_service: Optional[RecommendationService] = None
+_recommendation_service_lock = threading.Lock()
 
 
 def get_recommendation_service() -> RecommendationService:
-    """Get singleton recommendation service instance."""
+    """
+    Get singleton recommendation service instance.
+    
+    Construction is guarded by a lock so concurrent first requests share a
+    single Mistral client (and its connection pool) instead of racing to
+    build one each. The client is httpx-based and safe to share across tasks.
+    """
     global _recommendation_service
     if _recommendation_service is None:
-        _recommendation_service = RecommendationService()
+        with _recommendation_service_lock:
+            if _recommendation_service is None:
+                _recommendation_service = RecommendationService()
     return _recommendation_service
@@ -1,7 +1,8 @@
 """File upload utilities for handling transcript and document uploads."""
+import asyncio
 import os
-import re
-import uuid
+import secrets
+import string
 from pathlib import Path
 from typing import Optional
 
@@ -10,21 +11,40 @@ from fastapi import UploadFile, HTTPException, status
 
 # Configuration
 UPLOAD_DIR = Path("/app/uploads/transcripts")
+_UPLOAD_DIR_RESOLVED = UPLOAD_DIR.resolve()
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB in bytes
-ALLOWED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png"}
-ALLOWED_MIME_TYPES = {
+ALLOWED_EXTENSIONS = frozenset({".pdf", ".jpg", ".jpeg", ".png"})
+ALLOWED_MIME_TYPES = frozenset({
     "application/pdf",
     "image/jpeg",
     "image/jpg",
     "image/png"
-}
+})
+# Built once, in a stable order, for the rejection message
+_ALLOWED_EXTENSIONS_TEXT = ", ".join(sorted(ALLOWED_EXTENSIONS))
+
+# Translation table mapping every disallowed ASCII character to "_"
+_FILENAME_ALLOWED = frozenset(string.ascii_letters + string.digits + "._-")
+_FILENAME_TABLE = str.maketrans({
+    chr(c): "_" for c in range(128) if chr(c) not in _FILENAME_ALLOWED
+})
+
+# Set once ensure_upload_dir() has run, so uploads only create the dir once
+_upload_dir_ready = False
 
 
 def ensure_upload_dir() -> None:
-    """Ensure the upload directory exists with secure permissions."""
+    """
+    Ensure the upload directory exists with secure permissions.
+    
+    Called lazily by the first save_upload_file() rather than at startup,
+    so the app still boots where the upload path is not writable.
+    """
+    global _upload_dir_ready
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     # Set directory permissions (owner read/write/execute only)
     os.chmod(UPLOAD_DIR, 0o700)
+    _upload_dir_ready = True
 
 
 def sanitize_filename(filename: str) -> str:
@@ -42,10 +62,13 @@ def sanitize_filename(filename: str) -> str:
     
     # Remove dangerous characters
     # Keep only alphanumeric, dots, hyphens, underscores
-    filename = re.sub(r'[^a-zA-Z0-9._-]', '_', filename)
+    filename = filename.translate(_FILENAME_TABLE)
+    if not filename.isascii():
+        # "?" never survives the table above, so it only marks non-ASCII here
+        filename = filename.encode("ascii", "replace").decode("ascii").replace("?", "_")
     
     # Prevent hidden files
-    if filename.startswith('.'):
+    if filename[:1] == '.':
         filename = '_' + filename
     
     # Limit length
@@ -72,7 +95,7 @@ def validate_file_type(filename: str, content_type: str) -> None:
     if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+            detail=f"File type not allowed. Allowed types: {_ALLOWED_EXTENSIONS_TEXT}"
         )
     
     if content_type not in ALLOWED_MIME_TYPES:
@@ -116,15 +139,15 @@ def generate_unique_filename(original_filename: str) -> str:
         original_filename: Original filename from upload
         
     Returns:
-        Unique filename with UUID prefix (sanitized)
+        Unique filename made of a random hex token and the original extension
     """
-    # Sanitize the original filename first
-    sanitized = sanitize_filename(original_filename)
-    
-    file_ext = Path(sanitized).suffix.lower()
-    unique_id = uuid.uuid4().hex[:16]
+    # Only the extension is kept; anything outside the allow-list is dropped
+    file_ext = Path(original_filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        file_ext = ""
+    unique_id = secrets.token_hex(8)
     
-    # Use only UUID and extension to prevent any path traversal
+    # Use only the random token and extension to prevent any path traversal
     return f"{unique_id}{file_ext}"
 
 
@@ -132,6 +155,9 @@ async def save_upload_file(file: UploadFile) -> str:
     """
     Save uploaded file to disk.
     
+    The blocking disk write runs in a worker thread so concurrent uploads
+    do not stall the event loop.
+    
     Args:
         file: Uploaded file
         
@@ -142,16 +168,16 @@ async def save_upload_file(file: UploadFile) -> str:
         HTTPException: If save operation fails
     """
     try:
-        ensure_upload_dir()
-        
         # Generate unique filename
         filename = generate_unique_filename(file.filename)
         file_path = UPLOAD_DIR / filename
         
-        # Save file
+        if not _upload_dir_ready:
+            await asyncio.to_thread(ensure_upload_dir)
+        
+        # Save file off the event loop
         content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        await asyncio.to_thread(file_path.write_bytes, content)
         
         return filename
     
@@ -162,10 +188,12 @@ async def save_upload_file(file: UploadFile) -> str:
         )
 
 
-def delete_file(filename: str) -> bool:
+async def delete_file(filename: str) -> bool:
     """
     Delete a file from the upload directory.
     
+    The unlink runs in a worker thread to keep the event loop free.
+    
     Args:
         filename: Name of file to delete
         
@@ -178,17 +206,21 @@ def delete_file(filename: str) -> bool:
     try:
         file_path = UPLOAD_DIR / filename
         
-        if not file_path.exists():
+        try:
+            resolved = file_path.resolve(strict=True)
+        except FileNotFoundError:
             return False
         
         # Ensure the file is within the upload directory (security check)
-        if not str(file_path.resolve()).startswith(str(UPLOAD_DIR.resolve())):
+        try:
+            resolved.relative_to(_UPLOAD_DIR_RESOLVED)
+        except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid file path"
             )
         
-        file_path.unlink()
+        await asyncio.to_thread(file_path.unlink)
         return True
     
     except HTTPException:
@@ -212,11 +244,11 @@ def get_file_path(filename: str) -> Optional[Path]:
     """
     file_path = UPLOAD_DIR / filename
     
-    if not file_path.exists():
-        return None
-    
-    # Security check
-    if not str(file_path.resolve()).startswith(str(UPLOAD_DIR.resolve())):
+    # Existence and containment in one resolve; a component-wise check is
+    # not fooled by sibling directories sharing the upload dir's prefix
+    try:
+        file_path.resolve(strict=True).relative_to(_UPLOAD_DIR_RESOLVED)
+    except (OSError, ValueError):
         return None
     
     return file_path
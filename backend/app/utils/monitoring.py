@@ -1,6 +1,7 @@
 """System health monitoring utilities."""
 import logging
 import psutil
+import threading
 import time
 from typing import Dict, Any
 from datetime import datetime
@@ -78,9 +79,15 @@ class SystemMonitor:
 
 
 class PerformanceMonitor:
-    """Monitor application performance metrics."""
+    """
+    Monitor application performance metrics.
+    
+    Counters are updated and read under a lock so concurrent requests in
+    threaded workers cannot lose increments or observe a torn snapshot.
+    """
     
     def __init__(self):
+        self._lock = threading.Lock()
         self.request_count = 0
         self.error_count = 0
         self.total_response_time = 0.0
@@ -88,39 +95,48 @@ class PerformanceMonitor:
     
     def record_request(self, response_time_ms: float, is_error: bool = False):
         """Record a request for metrics tracking."""
-        self.request_count += 1
-        if is_error:
-            self.error_count += 1
-        self.total_response_time += response_time_ms
+        with self._lock:
+            self.request_count += 1
+            if is_error:
+                self.error_count += 1
+            self.total_response_time += response_time_ms
     
     def get_metrics(self) -> Dict[str, Any]:
         """Get current performance metrics."""
-        uptime_seconds = time.time() - self.start_time
+        # Snapshot under the lock, aggregate outside it
+        with self._lock:
+            request_count = self.request_count
+            error_count = self.error_count
+            total_response_time = self.total_response_time
+            start_time = self.start_time
+        
+        uptime_seconds = time.time() - start_time
         avg_response_time = (
-            self.total_response_time / self.request_count 
-            if self.request_count > 0 
+            total_response_time / request_count 
+            if request_count > 0 
             else 0
         )
         error_rate = (
-            (self.error_count / self.request_count * 100) 
-            if self.request_count > 0 
+            (error_count / request_count * 100) 
+            if request_count > 0 
             else 0
         )
         
         return {
             "uptime_seconds": round(uptime_seconds, 2),
-            "total_requests": self.request_count,
-            "total_errors": self.error_count,
+            "total_requests": request_count,
+            "total_errors": error_count,
             "error_rate_percent": round(error_rate, 2),
             "avg_response_time_ms": round(avg_response_time, 2)
         }
     
     def reset(self):
         """Reset all counters."""
-        self.request_count = 0
-        self.error_count = 0
-        self.total_response_time = 0.0
-        self.start_time = time.time()
+        with self._lock:
+            self.request_count = 0
+            self.error_count = 0
+            self.total_response_time = 0.0
+            self.start_time = time.time()
 
 
 # Global monitor instance
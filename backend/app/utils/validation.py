@@ -186,9 +186,26 @@ def validate_grade(grade: float | None, min_value: float = 0.0, max_value: float
     return grade
 
 
+_SANITIZED_KINDS = (str, dict, list)
+
+
+def _value_kind(value: Any) -> type:
+    """Return the sanitizer kind of a value, resolving subclasses to their base."""
+    kind = type(value)
+    if kind in _SANITIZED_KINDS:
+        return kind
+    for base in _SANITIZED_KINDS:
+        if isinstance(value, base):
+            return base
+    return object
+
+
 def sanitize_dict(data: dict[str, Any], max_string_length: int = 1000) -> dict[str, Any]:
     """
-    Recursively sanitize dictionary values.
+    Sanitize dictionary values, including nested dictionaries and lists.
+    
+    Nested dictionaries are walked with an explicit work stack rather than
+    recursion, so deeply nested payloads cannot hit the recursion limit.
     
     Args:
         data: Dictionary to sanitize
@@ -197,21 +214,33 @@ def sanitize_dict(data: dict[str, Any], max_string_length: int = 1000) -> dict[s
     Returns:
         Sanitized dictionary
     """
-    result = {}
-    
-    for key, value in data.items():
-        if isinstance(value, str):
-            result[key] = sanitize_string(value, max_string_length)
-        elif isinstance(value, dict):
-            result[key] = sanitize_dict(value, max_string_length)
-        elif isinstance(value, list):
-            result[key] = [
-                sanitize_dict(item, max_string_length) if isinstance(item, dict)
-                else sanitize_string(item, max_string_length) if isinstance(item, str)
-                else item
-                for item in value
-            ]
-        else:
-            result[key] = value
+    result: dict[str, Any] = {}
+    stack: list[tuple[dict[str, Any], dict[str, Any]]] = [(data, result)]
+    
+    while stack:
+        source, target = stack.pop()
+        for key, value in source.items():
+            kind = _value_kind(value)
+            if kind is str:
+                target[key] = sanitize_string(value, max_string_length)
+            elif kind is dict:
+                child: dict[str, Any] = {}
+                target[key] = child
+                stack.append((value, child))
+            elif kind is list:
+                items = []
+                for item in value:
+                    item_kind = _value_kind(item)
+                    if item_kind is str:
+                        items.append(sanitize_string(item, max_string_length))
+                    elif item_kind is dict:
+                        child = {}
+                        items.append(child)
+                        stack.append((item, child))
+                    else:
+                        items.append(item)
+                target[key] = items
+            else:
+                target[key] = value
     
     return result
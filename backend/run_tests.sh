@@ -21,6 +21,7 @@ COVERAGE=true
 VERBOSE=""
 TEST_PATH="tests/"
 MARKERS=""
+WORKERS="auto"
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -40,6 +41,10 @@ while [[ $# -gt 0 ]]; do
             MARKERS="-k $2"
             shift 2
             ;;
+        -n|--workers)
+            WORKERS="$2"
+            shift 2
+            ;;
         -p|--path)
             TEST_PATH="$2"
             shift 2
@@ -52,6 +57,7 @@ while [[ $# -gt 0 ]]; do
             echo "  -v, --verbose        Verbose output"
             echo "  -m, --markers MARK   Run tests with specific marker (unit, integration, e2e)"
             echo "  -k, --keyword EXPR   Run tests matching keyword expression"
+            echo "  -n, --workers N      Number of pytest-xdist workers (default: auto, 0 disables)"
             echo "  -p, --path PATH      Run tests in specific path"
             echo "  -h, --help           Show this help message"
             echo ""
@@ -73,13 +79,18 @@ done
 # Check if pytest is installed
 if ! command -v pytest &> /dev/null; then
     echo -e "${RED}Error: pytest is not installed${NC}"
-    echo "Install with: pip install pytest pytest-asyncio pytest-cov"
+    echo "Install with: pip install pytest pytest-asyncio pytest-cov pytest-xdist"
     exit 1
 fi
 
 # Build pytest command
 PYTEST_CMD="pytest $VERBOSE $MARKERS $TEST_PATH"
 
+if [ "$WORKERS" != "0" ]; then
+    # loadgroup keeps tests marked with the same xdist_group on one worker
+    PYTEST_CMD="$PYTEST_CMD -n $WORKERS --dist loadgroup"
+fi
+
 if [ "$COVERAGE" = true ]; then
     PYTEST_CMD="$PYTEST_CMD --cov=app --cov-report=term-missing --cov-report=html"
 fi
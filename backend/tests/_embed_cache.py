@@ -0,0 +1,85 @@
+"""On-disk embedding cache for the Pinecone test scripts."""
+import hashlib
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Any, List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / ".embed_cache.sqlite3"
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wrap an embedding model with a content-hash cache stored in SQLite.
+
+    Texts are keyed on SHA-256(model_name || "\\0" || text), so re-runs over
+    the same documents skip the API and only cache misses are embedded.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _conn: sqlite3.Connection = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache_path: Path = DEFAULT_CACHE_PATH, **kwargs: Any):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs
+        )
+        self._inner = inner
+        self._conn = sqlite3.connect(cache_path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).digest()
+
+    def get_text_embedding_batch(
+        self,
+        texts: List[str],
+        show_progress: bool = False,
+        **kwargs: Any,
+    ) -> List[Embedding]:
+        """Return cached vectors and embed the misses in one batched call."""
+        keys = [self._key(text) for text in texts]
+        unique_keys = list(dict.fromkeys(keys))
+
+        rows = self._conn.execute(
+            f"SELECT hash, vec FROM embeddings WHERE hash IN ({','.join('?' * len(unique_keys))})",
+            unique_keys,
+        ).fetchall() if unique_keys else []
+        cached = {key: array("d", vec).tolist() for key, vec in rows}
+
+        uncached = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if uncached:
+            embeddings = self._inner.get_text_embedding_batch(
+                list(uncached.values()), show_progress=show_progress, **kwargs
+            )
+            new = dict(zip(uncached, embeddings))
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                    [(key, array("d", vec).tobytes()) for key, vec in new.items()],
+                )
+            cached.update(new)
+
+        return [cached[key] for key in keys]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self.get_text_embedding_batch([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self.get_text_embedding_batch(texts)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._inner.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._inner.aget_query_embedding(query)
@@ -1,57 +1,191 @@
 """Pytest configuration and fixtures."""
 import os
+import httpx
 import pytest
-from typing import Generator
+import pytest_asyncio
+from typing import AsyncGenerator, Generator
+from uuid import UUID, uuid4
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
-from app.main import create_app
+from app import db
+from app.api.deps import get_session
 from app.db import Base
-from app.core.config import get_settings
 
 
-# Test database URL (use in-memory SQLite for fast tests)
-TEST_DATABASE_URL = "sqlite:///:memory:"
+# Test database URL (use in-memory SQLite for fast tests). Each pytest-xdist
+# worker gets its own named in-memory database so workers never share state.
+TEST_WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+TEST_DATABASE_URL = (
+    f"sqlite:///file:memdb_{TEST_WORKER_ID}?mode=memory&cache=shared&uri=true"
+)
+
+
+# Let the Postgres-only column types render on SQLite so the schema can be
+# created in the test database
+@compiles(JSONB, "sqlite")
+@compiles(ARRAY, "sqlite")
+def _compile_json_on_sqlite(type_, compiler, **kw):
+    return "JSON"
 
 
 @pytest.fixture(scope="session")
 def test_engine():
-    """Create test database engine."""
+    """
+    Create test database engine.
+    
+    StaticPool hands every session the same connection, so all of them see
+    the one in-memory database (and its tables) instead of a fresh empty one.
+    """
     engine = create_engine(
         TEST_DATABASE_URL,
         connect_args={"check_same_thread": False},  # Needed for SQLite
-        poolclass=None,  # Disable pooling for in-memory DB
+        poolclass=StaticPool,  # Share a single in-memory DB across sessions
+        insertmanyvalues_page_size=500,  # Batch multi-row fixture inserts
     )
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_conn, connection_record):
+        # Let SQLAlchemy emit BEGIN itself so SAVEPOINTs work under pysqlite
+        dbapi_conn.isolation_level = None
+        # Durability is irrelevant for a throwaway in-memory database
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+    
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="module")
+def test_connection(test_engine):
+    """Open one database connection shared by every test in a module."""
+    connection = test_engine.connect()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
 @pytest.fixture(scope="function")
-def test_db(test_engine) -> Generator[Session, None, None]:
-    """Create a fresh database session for each test."""
-    TestSessionLocal = sessionmaker(
-        autocommit=False,
+def test_db(test_connection) -> Generator[Session, None, None]:
+    """
+    Create a database session for each test inside an outer transaction.
+    
+    The session joins the transaction in SAVEPOINT mode, so tests may call
+    commit() freely; rolling back the outer transaction discards it all.
+    """
+    transaction = test_connection.begin()
+    session = Session(
+        bind=test_connection,
         autoflush=False,
-        bind=test_engine
+        join_transaction_mode="create_savepoint",
     )
-    session = TestSessionLocal()
     try:
         yield session
     finally:
-        session.rollback()
         session.close()
+        transaction.rollback()
+
+
+@pytest.fixture(scope="session")
+def postgres_engine() -> Generator:
+    """
+    Start a throwaway Postgres container once and create the schema in it.
+    
+    Skips when testcontainers is not installed or Docker is unavailable.
+    """
+    postgres = pytest.importorskip("testcontainers.postgres")
+    
+    try:
+        container = postgres.PostgresContainer("postgres:15").start()
+    except Exception as exc:
+        pytest.skip(f"Postgres container unavailable: {exc}")
+    
+    try:
+        engine = create_engine(container.get_connection_url())
+        Base.metadata.create_all(engine)
+        yield engine
+        engine.dispose()
+    finally:
+        container.stop()
+
+
+@pytest.fixture(scope="function")
+def pg_session(postgres_engine) -> Generator[Session, None, None]:
+    """
+    Create a Postgres session for each test inside an outer transaction.
+    
+    Same SAVEPOINT recipe as test_db, so each test costs one rollback
+    instead of a schema rebuild.
+    """
+    connection = postgres_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="session")
+def app(test_engine) -> FastAPI:
+    """
+    Build the FastAPI application once for the whole test session.
+    
+    Request-scoped database sessions come from the in-memory test engine
+    rather than the configured Postgres database.
+    """
+    # Imported here so collecting unit tests does not build the whole app
+    from app.main import create_app
+    
+    app = create_app()
+    
+    def get_test_session() -> Generator[Session, None, None]:
+        with Session(test_engine) as session:
+            yield session
+    
+    app.dependency_overrides[get_session] = get_test_session
+    return app
 
 
 @pytest.fixture(scope="module")
-def test_client() -> Generator[TestClient, None, None]:
+def override_get_engine(test_engine) -> Generator[None, None, None]:
+    """Point app.db.get_engine() at the test engine for API test modules."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(db, "get_engine", lambda test=False: test_engine)
+        yield
+
+
+@pytest.fixture(scope="module")
+def test_client(app, override_get_engine) -> Generator[TestClient, None, None]:
     """Create a test client for API testing."""
-    app = create_app()
     with TestClient(app) as client:
         yield client
 
 
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def async_client(app, override_get_engine) -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Create an in-process async client over the ASGI transport."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
 @pytest.fixture
 def test_session(test_db) -> Generator[Session, None, None]:
     """Alias for test_db fixture for compatibility."""
@@ -113,12 +247,143 @@ def sample_profile_data() -> dict:
     }
 
 
-@pytest.fixture(autouse=True)
-def reset_rate_limit():
-    """Reset rate limit state between tests."""
-    # This would reset the in-memory rate limit counter
-    # Implementation depends on how rate limiting is structured
-    yield
+# Name of the profile shared by the live recommendation pipeline tests
+RECOMMENDATION_PROFILE_NAME = "Computer Science Track - Test"
+
+# Fixed content of that profile, built once at import
+_RECOMMENDATION_SUBJECT_GRADES = (
+    ("Mathématiques", 18.0),
+    ("Physique-Chimie", 17.5),
+    ("Sciences de l'Ingénieur", 16.0),
+    ("Informatique", 19.0),
+    ("Français", 14.0),
+    ("Anglais", 15.5),
+)
+_RECOMMENDATION_FAVORITE_SUBJECTS = ("Computer Science", "Mathematics", "Artificial Intelligence")
+_RECOMMENDATION_DISLIKED_SUBJECTS = ("Biology", "Literature")
+_RECOMMENDATION_SOFT_SKILLS = ("Problem Solving", "Teamwork", "Critical Thinking")
+_RECOMMENDATION_HOBBIES = ("Programming", "Gaming", "Robotics")
+
+
+def create_test_profile(db: Session):
+    """Create a test student profile for recommendation testing."""
+    # Imported here so collecting unit tests does not load the models
+    from app.models.profile import AcademicRecord, Profile, StudentPreferences, SubjectGrade
+    from app.models.user import User
+    
+    # Check if test user exists
+    user_id = db.execute(select(User.id).where(User.email == "test@sira.ma")).scalar()
+    
+    if user_id is None:
+        user_id = uuid4()
+        db.execute(insert(User), [{
+            "id": user_id,
+            "clerk_user_id": "test_clerk_123",
+            "email": "test@sira.ma"
+        }])
+    
+    # Build every row up front; ids are assigned here so no flush is needed
+    # to learn foreign keys
+    profile_row = {
+        "id": uuid4(),
+        "user_id": user_id,
+        "profile_name": RECOMMENDATION_PROFILE_NAME,
+        "status": "active"
+    }
+    academic_record_row = {
+        "id": uuid4(),
+        "profile_id": profile_row["id"],
+        "current_status": "high_school",
+        "current_institution": "Lycée Mohammed V",
+        "current_field": "Science Mathématiques B",
+        "gpa": 16.5,
+        "language_preference": "French"
+    }
+    
+    # Subject grades
+    grade_rows = [
+        {
+            "id": uuid4(),
+            "academic_record_id": academic_record_row["id"],
+            "subject_name": subject_name,
+            "grade": grade,
+            "weight": 1.0
+        }
+        for subject_name, grade in _RECOMMENDATION_SUBJECT_GRADES
+    ]
+    
+    # Student preferences; the ARRAY columns need lists, since psycopg2
+    # adapts tuples to records
+    preferences_row = {
+        "id": uuid4(),
+        "profile_id": profile_row["id"],
+        "favorite_subjects": list(_RECOMMENDATION_FAVORITE_SUBJECTS),
+        "disliked_subjects": list(_RECOMMENDATION_DISLIKED_SUBJECTS),
+        "soft_skills": list(_RECOMMENDATION_SOFT_SKILLS),
+        "hobbies": list(_RECOMMENDATION_HOBBIES),
+        "geographic_preference": "Morocco",
+        "budget_range_min": 20000,
+        "budget_range_max": 60000,
+        "career_goals": "Software Engineer or Data Scientist specializing in AI"
+    }
+    
+    # Parents before children, one transaction; the grades go out as a
+    # single executemany
+    db.execute(insert(Profile), [profile_row])
+    db.execute(insert(AcademicRecord), [academic_record_row])
+    db.execute(insert(SubjectGrade), grade_rows)
+    db.execute(insert(StudentPreferences), [preferences_row])
+    db.commit()
+    
+    return profile_row["id"]
+
+
+# Detached profiles loaded by load_profile_snapshot, keyed on profile id
+_profile_snapshots: dict = {}
+
+
+def load_profile_snapshot(db: Session, profile_id: UUID):
+    """
+    Load a profile with its relationships once and return it detached.
+    
+    profile_repository.get_by_id eager-loads the academic record, grades
+    and preferences, so the detached copy can be read by every pipeline
+    step without another query. The cache is keyed on the profile id alone,
+    so it never keeps the caller's session alive.
+    """
+    profile = _profile_snapshots.get(profile_id)
+    if profile is None:
+        from app.repositories import profile_repository
+        
+        profile = profile_repository.get_by_id(db, profile_id)
+        if profile is not None:
+            # Expunge cascades to the loaded record, grades and preferences;
+            # anything else the session holds stays attached
+            db.expunge(profile)
+            _profile_snapshots[profile_id] = profile
+    return profile
+
+
+@pytest.fixture(scope="session")
+def test_profile_id() -> UUID:
+    """
+    Create the recommendation test profile once per test session.
+    
+    Works against the configured database; a profile left by an earlier
+    session is reused instead of inserting a duplicate.
+    """
+    from app.db import session_scope
+    from app.models.profile import Profile
+    
+    with session_scope() as db:
+        profile_id = db.execute(
+            select(Profile.id)
+            .where(Profile.profile_name == RECOMMENDATION_PROFILE_NAME)
+            .limit(1)
+        ).scalar()
+        if profile_id is None:
+            profile_id = create_test_profile(db)
+    return profile_id
 
 
 @pytest.fixture
@@ -1,17 +1,14 @@
 """Integration tests for profile API endpoints."""
 import pytest
 from fastapi import status
-from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch
 
-from app.main import create_app
 
+# Run every test in this module on one event loop shared with async_client
+pytestmark = pytest.mark.asyncio(loop_scope="module")
 
-@pytest.fixture
-def client():
-    """Create test client."""
-    app = create_app()
-    return TestClient(app)
+# Without a real token, auth rejects with 401 before validation can return 422
+REJECTED = [status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY]
 
 
 @pytest.fixture
@@ -28,7 +25,7 @@ class TestProfileEndpoints:
     """Integration tests for profile endpoints."""
 
     @patch("app.api.routes.profiles.get_current_user")
-    def test_create_profile_success(self, mock_auth, client, mock_current_user):
+    async def test_create_profile_success(self, mock_auth, async_client, mock_current_user):
         """Test successful profile creation."""
         mock_auth.return_value = mock_current_user
         
@@ -41,7 +38,7 @@ class TestProfileEndpoints:
             }
         }
         
-        response = client.post(
+        response = await async_client.post(
             "/api/profiles",
             json=profile_data,
             headers={"Authorization": "Bearer mock_token"}
@@ -51,154 +48,86 @@ class TestProfileEndpoints:
         # but demonstrates the test structure
         # assert response.status_code == status.HTTP_201_CREATED
 
-    def test_create_profile_without_auth(self, client):
+    async def test_create_profile_without_auth(self, async_client):
         """Test profile creation without authentication fails."""
         profile_data = {
             "profile_name": "Test Profile",
             "status": "draft"
         }
         
-        response = client.post("/api/profiles", json=profile_data)
+        response = await async_client.post("/api/profiles", json=profile_data)
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
-    def test_create_profile_invalid_data(self, client):
-        """Test profile creation with invalid data returns validation error."""
-        invalid_data = {
-            "profile_name": "",  # Empty name
-            "status": "invalid_status",  # Invalid status
-            "academic_record": {
-                "gpa": 25.0  # Invalid GPA
-            }
-        }
-        
-        response = client.post(
-            "/api/profiles",
-            json=invalid_data,
-            headers={"Authorization": "Bearer mock_token"}
-        )
-        
-        # Expecting 401 because auth is not properly mocked in this test
-        # In a real scenario with authenticated_client fixture, this would be 422
-        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY]
-
-    def test_create_profile_xss_prevention(self, client):
-        """Test XSS attempts in profile data are sanitized."""
-        xss_data = {
-            "profile_name": "<script>alert('xss')</script>",
-            "status": "draft",
-            "preferences": {
-                "career_goals": "<img src=x onerror=alert('xss')>"
-            }
-        }
-        
-        response = client.post(
-            "/api/profiles",
-            json=xss_data,
-            headers={"Authorization": "Bearer mock_token"}
-        )
-        
-        # Should either sanitize, reject, or require auth
-        if response.status_code in [status.HTTP_422_UNPROCESSABLE_ENTITY, status.HTTP_401_UNAUTHORIZED]:
-            # Validation error expected
-            assert True
-        # If created, check data is sanitized (would need DB mock)
-
-    def test_create_profile_sql_injection_prevention(self, client):
-        """Test SQL injection attempts are prevented."""
-        injection_data = {
-            "profile_name": "Test'; DROP TABLE profiles; --",
-            "status": "draft"
-        }
-        
-        response = client.post(
-            "/api/profiles",
-            json=injection_data,
-            headers={"Authorization": "Bearer mock_token"}
-        )
-        
-        # SQLAlchemy should prevent SQL injection through parameterized queries
-        # This test verifies the endpoint doesn't crash
-        assert response.status_code in [
-            status.HTTP_401_UNAUTHORIZED,  # No auth
-            status.HTTP_422_UNPROCESSABLE_ENTITY,  # Validation error
-            status.HTTP_201_CREATED,  # Success (data sanitized)
-        ]
-
 
 class TestProfileValidationEndpoints:
     """Tests for profile endpoint validation."""
 
-    def test_invalid_gpa_rejected(self, client):
-        """Test profile with invalid GPA is rejected."""
-        data = {
-            "profile_name": "Test",
-            "academic_record": {
-                "gpa": 100.0  # Invalid: max is 20
-            }
-        }
-        
-        response = client.post(
-            "/api/profiles",
-            json=data,
-            headers={"Authorization": "Bearer mock_token"}
-        )
-        
-        # Expecting 401 (auth) or 422 (validation)
-        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY]
-
-    def test_invalid_grade_rejected(self, client):
-        """Test subject grade outside valid range is rejected."""
-        data = {
-            "profile_name": "Test",
-            "academic_record": {
-                "subject_grades": [
-                    {"subject_name": "Math", "grade": 101.0}
-                ]
-            }
-        }
-        
-        response = client.post(
-            "/api/profiles",
-            json=data,
-            headers={"Authorization": "Bearer mock_token"}
-        )
-        
-        # Expecting 401 (auth) or 422 (validation)
-        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY]
-
-    def test_invalid_budget_range_rejected(self, client):
-        """Test budget range where min > max is rejected."""
-        data = {
-            "profile_name": "Test",
-            "preferences": {
-                "budget_range_min": 20000,
-                "budget_range_max": 10000
-            }
-        }
-        
-        response = client.post(
-            "/api/profiles",
-            json=data,
-            headers={"Authorization": "Bearer mock_token"}
-        )
-        
-        # Expecting 401 (auth) or 422 (validation)
-        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY]
-
-    def test_invalid_url_rejected(self, client):
-        """Test dangerous URL protocol is rejected."""
-        data = {
-            "profile_name": "Test",
-            "academic_record": {
-                "transcript_url": "javascript:alert('xss')"
-            }
-        }
-        
-        response = client.post(
+    @pytest.mark.parametrize(
+        "payload,expected",
+        [
+            pytest.param(
+                {
+                    "profile_name": "",  # Empty name
+                    "status": "invalid_status",  # Invalid status
+                    "academic_record": {"gpa": 25.0},  # Invalid GPA
+                },
+                REJECTED,
+                id="invalid_data",
+            ),
+            pytest.param(
+                {
+                    "profile_name": "<script>alert('xss')</script>",
+                    "status": "draft",
+                    "preferences": {"career_goals": "<img src=x onerror=alert('xss')>"},
+                },
+                REJECTED,
+                id="xss",
+            ),
+            pytest.param(
+                # SQLAlchemy parameterizes queries, so this may also be created as-is
+                {"profile_name": "Test'; DROP TABLE profiles; --", "status": "draft"},
+                REJECTED + [status.HTTP_201_CREATED],
+                id="sql_injection",
+            ),
+            pytest.param(
+                {"profile_name": "Test", "academic_record": {"gpa": 100.0}},  # Max is 20
+                REJECTED,
+                id="invalid_gpa",
+            ),
+            pytest.param(
+                {
+                    "profile_name": "Test",
+                    "academic_record": {
+                        "subject_grades": [{"subject_name": "Math", "grade": 101.0}]
+                    },
+                },
+                REJECTED,
+                id="invalid_grade",
+            ),
+            pytest.param(
+                {
+                    "profile_name": "Test",
+                    "preferences": {"budget_range_min": 20000, "budget_range_max": 10000},
+                },
+                REJECTED,
+                id="invalid_budget_range",
+            ),
+            pytest.param(
+                {
+                    "profile_name": "Test",
+                    "academic_record": {"transcript_url": "javascript:alert('xss')"},
+                },
+                REJECTED,
+                id="dangerous_url",
+            ),
+        ],
+    )
+    async def test_profile_payload_rejected(self, async_client, payload, expected):
+        """Test invalid or malicious profile payloads are rejected."""
+        response = await async_client.post(
             "/api/profiles",
-            json=data,
+            json=payload,
             headers={"Authorization": "Bearer mock_token"}
         )
         
-        # Expecting 401 (auth) or 422 (validation)
-        assert response.status_code in [status.HTTP_401_UNAUTHORIZED, status.HTTP_422_UNPROCESSABLE_ENTITY]
+        assert response.status_code in expected
@@ -1,140 +1,165 @@
 """Comprehensive test for all database models with SQLAlchemy."""
 
-from datetime import datetime, timezone
 from uuid import uuid4
 
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+import pytest
 
-from app.db import get_engine, Base
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import cast, delete, insert, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.db import ensure_schema, get_engine
 from app.models.user import User
 from app.models.profile import Profile, AcademicRecord, SubjectGrade, StudentPreferences
 
+# Writes to the configured application database, so tests like it share one
+# xdist worker instead of racing each other
+pytestmark = pytest.mark.xdist_group("app_database")
+
 
 def test_complete_models():
     """Test all models with relationships and PostgreSQL-specific types."""
     engine = get_engine()
     
-    # Ensure tables exist
-    Base.metadata.create_all(engine)
+    # Ensure tables exist; skipped when the schema key is unchanged
+    ensure_schema(engine)
+    
+    clerk_user_id = f"test_clerk_{uuid4().hex[:8]}"
     
     with Session(engine) as session:
-        # Create user
-        user = User(
-            clerk_user_id=f"test_clerk_{uuid4().hex[:8]}",
-            email=f"test_{uuid4().hex[:8]}@example.com"
-        )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        
-        print(f"✅ User created: {user.email}")
-        
-        # Create profile with JSONB
-        profile = Profile(
-            user_id=user.id,
-            profile_name="Full Computer Science Profile",
-            status="active",
-            draft_payload={
-                "wizard_step": 3,
-                "notes": "Testing JSONB field",
-                "metadata": {"version": 1}
-            }
-        )
-        session.add(profile)
-        session.commit()
-        session.refresh(profile)
-        
-        print(f"✅ Profile created: {profile.profile_name}")
-        print(f"   - Draft payload: {profile.draft_payload}")
-        
-        # Create academic record
-        academic_record = AcademicRecord(
-            profile_id=profile.id,
-            current_status="Undergraduate",
-            current_institution="MIT",
-            current_field="Computer Science",
-            gpa=3.85,
-            language_preference="English"
-        )
-        session.add(academic_record)
-        session.commit()
-        session.refresh(academic_record)
+        try:
+            # Build the user -> profile tree through relationships so the whole
+            # graph is added with add_all() and inserted in a single flush
+            user = User(
+                clerk_user_id=clerk_user_id,
+                email=f"test_{uuid4().hex[:8]}@example.com"
+            )
         
-        print(f"✅ Academic record created: {academic_record.current_institution}")
+            # Profile with JSONB
+            profile = Profile(
+                user=user,
+                profile_name="Full Computer Science Profile",
+                status="active",
+                draft_payload={
+                    "wizard_step": 3,
+                    "notes": "Testing JSONB field",
+                    "metadata": {"version": 1}
+                }
+            )
         
-        # Create subject grades
-        subjects = [
-            ("Algorithms", 95.0, 4.0),
-            ("Data Structures", 92.0, 3.0),
-            ("Machine Learning", 88.0, 3.0),
-        ]
+            academic_record = AcademicRecord(
+                profile=profile,
+                current_status="Undergraduate",
+                current_institution="MIT",
+                current_field="Computer Science",
+                gpa=3.85,
+                language_preference="English"
+            )
         
-        for subject_name, grade, weight in subjects:
-            subject_grade = SubjectGrade(
-                academic_record_id=academic_record.id,
-                subject_name=subject_name,
-                grade=grade,
-                weight=weight
+            # Student preferences with ARRAY fields
+            preferences = StudentPreferences(
+                profile=profile,
+                favorite_subjects=["AI", "Machine Learning", "Algorithms"],
+                disliked_subjects=["History", "Literature"],
+                soft_skills=["Leadership", "Teamwork", "Problem Solving"],
+                hobbies=["Coding", "Chess", "Reading"],
+                geographic_preference="USA",
+                budget_range_min=20000,
+                budget_range_max=60000,
+                career_goals="Become an AI research scientist"
             )
-            session.add(subject_grade)
         
-        session.commit()
-        print(f"✅ Created {len(subjects)} subject grades")
+            session.add_all([user, profile, academic_record, preferences])
+            session.flush()  # Assigns PKs without ending the transaction
         
-        # Create student preferences with ARRAY fields
-        preferences = StudentPreferences(
-            profile_id=profile.id,
-            favorite_subjects=["AI", "Machine Learning", "Algorithms"],
-            disliked_subjects=["History", "Literature"],
-            soft_skills=["Leadership", "Teamwork", "Problem Solving"],
-            hobbies=["Coding", "Chess", "Reading"],
-            geographic_preference="USA",
-            budget_range_min=20000,
-            budget_range_max=60000,
-            career_goals="Become an AI research scientist"
-        )
-        session.add(preferences)
-        session.commit()
-        session.refresh(preferences)
+            print(f"✅ User created: {user.email}")
+            print(f"✅ Profile created: {profile.profile_name}")
+            print(f"   - Draft payload: {profile.draft_payload}")
+            print(f"✅ Academic record created: {academic_record.current_institution}")
         
-        print(f"✅ Preferences created with arrays:")
-        print(f"   - Favorite subjects: {preferences.favorite_subjects}")
-        print(f"   - Soft skills: {preferences.soft_skills}")
+            # Create subject grades
+            subjects = [
+                ("Algorithms", 95.0, 4.0),
+                ("Data Structures", 92.0, 3.0),
+                ("Machine Learning", 88.0, 3.0),
+            ]
         
-        # Test relationship loading
-        session.refresh(profile)
-        print(f"\n✅ Testing relationships:")
-        print(f"   - Profile has academic record: {profile.academic_record is not None}")
-        print(f"   - Profile has preferences: {profile.preferences is not None}")
-        print(f"   - Academic record has {len(profile.academic_record.subject_grades)} subject grades")
+            # Single multi-row INSERT ... RETURNING instead of one per subject;
+            # the returned rows become ORM objects in the identity map
+            subject_grades = session.scalars(
+                insert(SubjectGrade).returning(SubjectGrade),
+                [
+                    {
+                        "academic_record_id": academic_record.id,
+                        "subject_name": subject_name,
+                        "grade": grade,
+                        "weight": weight,
+                    }
+                    for subject_name, grade, weight in subjects
+                ],
+            ).all()
+            # Seed the collection from RETURNING so reading it needs no SELECT
+            set_committed_value(academic_record, "subject_grades", subject_grades)
+            print(f"✅ Created {len(subject_grades)} subject grades")
         
-        # Test queries
-        stmt = select(User).where(User.id == user.id)
-        retrieved_user = session.execute(stmt).scalar_one()
-        print(f"\n✅ Query test:")
-        print(f"   - Retrieved user: {retrieved_user.email}")
-        print(f"   - User has {len(retrieved_user.profiles)} profile(s)")
+            print(f"✅ Preferences created with arrays:")
+            print(f"   - Favorite subjects: {preferences.favorite_subjects}")
+            print(f"   - Soft skills: {preferences.soft_skills}")
         
-        # Test updating JSONB field
-        profile.draft_payload["wizard_step"] = 4
-        profile.draft_payload["completed"] = True
-        session.commit()
-        session.refresh(profile)
-        print(f"\n✅ JSONB update test:")
-        print(f"   - Updated payload: {profile.draft_payload}")
+            # Test queries, eager-loading the whole profile tree in one pass
+            stmt = (
+                select(User)
+                .where(User.id == user.id)
+                .options(
+                    selectinload(User.profiles).selectinload(Profile.academic_record),
+                    selectinload(User.profiles).selectinload(Profile.preferences),
+                )
+            )
+            retrieved_user = session.execute(stmt).scalar_one()
+        
+            # Test relationship loading
+            print(f"\n✅ Testing relationships:")
+            print(f"   - Profile has academic record: {profile.academic_record is not None}")
+            print(f"   - Profile has preferences: {profile.preferences is not None}")
+            print(f"   - Academic record has {len(profile.academic_record.subject_grades)} subject grades")
         
-        # Cleanup
-        print(f"\n🧹 Cleaning up test data...")
-        for subject_grade in academic_record.subject_grades:
-            session.delete(subject_grade)
-        session.delete(preferences)
-        session.delete(academic_record)
-        session.delete(profile)
-        session.delete(user)
-        session.commit()
+            print(f"\n✅ Query test:")
+            print(f"   - Retrieved user: {retrieved_user.email}")
+            print(f"   - User has {len(retrieved_user.profiles)} profile(s)")
         
-        print(f"✅ Cleanup complete!")
+            # Test updating JSONB field: merge keys server-side with jsonb ||
+            # rather than rewriting the whole document from Python
+            session.execute(
+                update(Profile)
+                .where(Profile.id == profile.id)
+                .values(
+                    draft_payload=Profile.draft_payload.op("||")(
+                        cast({"wizard_step": 4, "completed": True}, JSONB)
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()  # Single commit for everything created above
+            session.refresh(profile)
+            print(f"\n✅ JSONB update test:")
+            print(f"   - Updated payload: {profile.draft_payload}")
+        finally:
+            # Cleanup: one set-based DELETE per table, keyed on the test user,
+            # runs even if an assertion above failed
+            print(f"\n🧹 Cleaning up test data...")
+            session.rollback()
+            user_ids = select(User.id).where(User.clerk_user_id == clerk_user_id)
+            profile_ids = select(Profile.id).where(Profile.user_id.in_(user_ids))
+            record_ids = select(AcademicRecord.id).where(AcademicRecord.profile_id.in_(profile_ids))
+            session.execute(delete(SubjectGrade).where(SubjectGrade.academic_record_id.in_(record_ids)))
+            session.execute(delete(StudentPreferences).where(StudentPreferences.profile_id.in_(profile_ids)))
+            session.execute(delete(AcademicRecord).where(AcademicRecord.profile_id.in_(profile_ids)))
+            session.execute(delete(Profile).where(Profile.user_id.in_(user_ids)))
+            session.execute(delete(User).where(User.clerk_user_id == clerk_user_id))
+            session.commit()
+            
+            print(f"✅ Cleanup complete!")
     
     print(f"\n🎉 All comprehensive tests PASSED!")
     return True
@@ -1,15 +1,21 @@
 """Test conversation system API endpoints."""
 import asyncio
+import functools
+import json
 import logging
+import os
+import re
 import sys
-from pathlib import Path
-
-# Add backend to path
-backend_dir = Path(__file__).parent
-sys.path.insert(0, str(backend_dir))
+from operator import countOf, itemgetter
 
 import httpx
 
+# orjson parses the nested response bodies faster; it is optional here
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,80 @@ BASE_URL = "http://localhost:8000"
 TEST_USER_ID = "test-user-123"  # Replace with actual user ID
 TEST_AUTH_TOKEN = "your-clerk-jwt-token"  # Replace with actual Clerk JWT
 
+# Set SIRA_E2E=1 to hit the real backend; otherwise requests are answered
+# in-process by mock_backend() with canned responses
+RUN_E2E = os.getenv("SIRA_E2E") == "1"
+
+MOCK_SESSION_ID = "00000000-0000-4000-8000-000000000001"
+_SESSION_PATH = re.compile(r"^/api/conversations/sessions/(?P<id>[^/]+)(?P<action>/messages|/recommend)?$")
+
+
+def mock_backend(request: httpx.Request) -> httpx.Response:
+    """Route a request to a canned response shaped like the real endpoint."""
+    path = request.url.path
+    if path == "/health":
+        return httpx.Response(200, json={"status": "ok"})
+    
+    if path == "/api/conversations/sessions":
+        if request.method == "POST":
+            return httpx.Response(200, json={"id": MOCK_SESSION_ID, "title": "New Conversation"})
+        return httpx.Response(200, json={
+            "total": 1,
+            "sessions": [{"period": "Today", "sessions": [{"id": MOCK_SESSION_ID}]}],
+        })
+    
+    match = _SESSION_PATH.match(path)
+    if match is None or match["id"] != MOCK_SESSION_ID:
+        return httpx.Response(404, json={"detail": "Not found"})
+    
+    action = match["action"]
+    if action == "/messages" and request.method == "POST":
+        content = json_loads(request.content)["content"]
+        return httpx.Response(200, json={
+            "user_message": {"role": "user", "content": content},
+            "assistant_message": {"role": "assistant", "content": "Mock answer about admission requirements."},
+        })
+    if action == "/recommend" and request.method == "POST":
+        return httpx.Response(200, json={
+            "recommendation_id": "00000000-0000-4000-8000-000000000002",
+            "structured_data": {"program_names": ["Mock Program"]},
+        })
+    if action is None and request.method == "GET":
+        return httpx.Response(200, json={"id": MOCK_SESSION_ID, "messages": []})
+    if action is None and request.method == "PATCH":
+        return httpx.Response(200, json={"id": MOCK_SESSION_ID, **json_loads(request.content)})
+    if action is None and request.method == "DELETE":
+        return httpx.Response(204)
+    return httpx.Response(405, json={"detail": "Method not allowed"})
+
+
+def _report(label: str, *, needs_session: bool = False):
+    """
+    Wrap an API check with the shared skip, logging and error handling.
+    
+    The wrapped method returns (ok, response); the wrapper logs the outcome
+    and turns any exception into a failed check, so it always returns a bool.
+    """
+    def decorator(check):
+        @functools.wraps(check)
+        async def wrapper(self) -> bool:
+            if needs_session and not self.session_id:
+                logger.warning("⊘ Skipping %s (no session created)", label.lower())
+                return True
+            try:
+                ok, response = await check(self)
+            except Exception as e:
+                logger.error("✗ %s error: %s", label, e)
+                return False
+            if ok:
+                logger.info("✓ %s passed", label)
+            else:
+                logger.error("✗ %s failed: %s", label, response.status_code)
+                logger.error("  Response: %s", response.text)
+            return ok
+        return wrapper
+    return decorator
+
 
 class ConversationAPITester:
     """Test all conversation API endpoints."""
@@ -32,281 +112,242 @@ class ConversationAPITester:
         }
         self.session_id = None
         self.profile_id = None
+        self.client: httpx.AsyncClient | None = None
+    
+    async def __aenter__(self) -> "ConversationAPITester":
+        """Open one pooled client reused by every test for keep-alive."""
+        if RUN_E2E:
+            # HTTP/2 lets the concurrent checks of a stage share one
+            # connection; retries cover transient connect failures
+            transport = httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=1,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            )
+        else:
+            transport = httpx.MockTransport(mock_backend)
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=30.0,
+        )
+        return self
     
-    async def test_health_check(self) -> bool:
+    async def __aexit__(self, *exc_info) -> None:
+        """Close the shared client."""
+        await self.client.aclose()
+    
+    @_report("Backend health check")
+    async def test_health_check(self):
         """Test if backend is running."""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/health")
-                if response.status_code == 200:
-                    logger.info("✓ Backend health check passed")
-                    return True
-                else:
-                    logger.error(f"✗ Health check failed: {response.status_code}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Health check error: {str(e)}")
-            return False
+        response = await self.client.get("/health")
+        return response.status_code == 200, response
     
-    async def test_create_session(self) -> bool:
+    @_report("Create session")
+    async def test_create_session(self):
         """Test POST /api/conversations/sessions."""
-        try:
-            # First, get a profile ID (you'll need to create one or use existing)
-            async with httpx.AsyncClient() as client:
-                # This is a placeholder - you need an actual profile
-                payload = {
-                    "profile_id": self.profile_id or "test-profile-uuid"
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/api/conversations/sessions",
-                    json=payload,
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    self.session_id = data["id"]
-                    logger.info(f"✓ Created session: {self.session_id}")
-                    logger.info(f"  Title: {data['title']}")
-                    return True
-                else:
-                    logger.error(f"✗ Create session failed: {response.status_code}")
-                    logger.error(f"  Response: {response.text}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Create session error: {str(e)}")
-            return False
+        # First, get a profile ID (you'll need to create one or use existing)
+        # This is a placeholder - you need an actual profile
+        payload = {
+            "profile_id": self.profile_id or "test-profile-uuid"
+        }
+        
+        response = await self.client.post(
+            "/api/conversations/sessions",
+            json=payload
+        )
+        if response.status_code != 200:
+            return False, response
+        
+        data = json_loads(response.content)
+        self.session_id = data["id"]
+        logger.info("  Session: %s", self.session_id)
+        logger.info("  Title: %s", data['title'])
+        return True, response
     
-    async def test_list_sessions(self) -> bool:
+    @_report("List sessions")
+    async def test_list_sessions(self):
         """Test GET /api/conversations/sessions."""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/conversations/sessions",
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"✓ Listed sessions: {data['total']} total")
-                    logger.info(f"  Periods: {[p['period'] for p in data['sessions']]}")
-                    return True
-                else:
-                    logger.error(f"✗ List sessions failed: {response.status_code}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ List sessions error: {str(e)}")
-            return False
+        response = await self.client.get("/api/conversations/sessions")
+        if response.status_code != 200:
+            return False, response
+        
+        data = json_loads(response.content)
+        logger.info("  Total: %s", data['total'])
+        logger.info("  Periods: %s", [p['period'] for p in data['sessions']])
+        return True, response
     
-    async def test_get_session(self) -> bool:
+    @_report("Get session", needs_session=True)
+    async def test_get_session(self):
         """Test GET /api/conversations/sessions/{session_id}."""
-        if not self.session_id:
-            logger.warning("⊘ Skipping get session (no session created)")
-            return True
+        response = await self.client.get(f"/api/conversations/sessions/{self.session_id}")
+        if response.status_code != 200:
+            return False, response
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/conversations/sessions/{self.session_id}",
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"✓ Got session details")
-                    logger.info(f"  Messages: {len(data['messages'])}")
-                    return True
-                else:
-                    logger.error(f"✗ Get session failed: {response.status_code}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Get session error: {str(e)}")
-            return False
+        data = json_loads(response.content)
+        logger.info("  Messages: %s", len(data['messages']))
+        return True, response
     
-    async def test_send_message(self) -> bool:
+    @_report("Send message", needs_session=True)
+    async def test_send_message(self):
         """Test POST /api/conversations/sessions/{session_id}/messages."""
-        if not self.session_id:
-            logger.warning("⊘ Skipping send message (no session created)")
-            return True
+        payload = {
+            "content": "What are the admission requirements for the top program?"
+        }
+        
+        response = await self.client.post(
+            f"/api/conversations/sessions/{self.session_id}/messages",
+            json=payload,
+            timeout=60.0  # AI response may take time
+        )
+        if response.status_code != 200:
+            return False, response
         
-        try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "content": "What are the admission requirements for the top program?"
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/api/conversations/sessions/{self.session_id}/messages",
-                    json=payload,
-                    headers=self.headers,
-                    timeout=60.0  # AI response may take time
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"✓ Sent message and got AI response")
-                    logger.info(f"  User: {data['user_message']['content'][:50]}...")
-                    logger.info(f"  AI: {data['assistant_message']['content'][:100]}...")
-                    return True
-                else:
-                    logger.error(f"✗ Send message failed: {response.status_code}")
-                    logger.error(f"  Response: {response.text}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Send message error: {str(e)}")
-            return False
+        data = json_loads(response.content)
+        logger.info("  User: %s...", data['user_message']['content'][:50])
+        logger.info("  AI: %s...", data['assistant_message']['content'][:100])
+        return True, response
     
-    async def test_update_session(self) -> bool:
+    @_report("Update session", needs_session=True)
+    async def test_update_session(self):
         """Test PATCH /api/conversations/sessions/{session_id}."""
-        if not self.session_id:
-            logger.warning("⊘ Skipping update session (no session created)")
-            return True
+        payload = {
+            "title": "Updated Test Session",
+            "status": "active"
+        }
+        
+        response = await self.client.patch(
+            f"/api/conversations/sessions/{self.session_id}",
+            json=payload
+        )
+        if response.status_code != 200:
+            return False, response
         
-        try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "title": "Updated Test Session",
-                    "status": "active"
-                }
-                
-                response = await client.patch(
-                    f"{self.base_url}/api/conversations/sessions/{self.session_id}",
-                    json=payload,
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"✓ Updated session title: {data['title']}")
-                    return True
-                else:
-                    logger.error(f"✗ Update session failed: {response.status_code}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Update session error: {str(e)}")
-            return False
+        logger.info("  Title: %s", json_loads(response.content)['title'])
+        return True, response
     
-    async def test_generate_recommendation(self) -> bool:
+    @_report("Generate recommendation", needs_session=True)
+    async def test_generate_recommendation(self):
         """Test POST /api/conversations/sessions/{session_id}/recommend."""
-        if not self.session_id:
-            logger.warning("⊘ Skipping generate recommendation (no session created)")
-            return True
+        response = await self.client.post(
+            f"/api/conversations/sessions/{self.session_id}/recommend",
+            timeout=120.0  # RAG + LLM may take time
+        )
+        if response.status_code == 400 and "already has recommendation" in response.text:
+            logger.info("  Session already has a recommendation")
+            return True, response
+        if response.status_code != 200:
+            return False, response
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/api/conversations/sessions/{self.session_id}/recommend",
-                    headers=self.headers,
-                    timeout=120.0  # RAG + LLM may take time
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"✓ Generated recommendation")
-                    logger.info(f"  Recommendation ID: {data['recommendation_id']}")
-                    logger.info(f"  Programs: {len(data['structured_data'].get('program_names', []))}")
-                    return True
-                elif response.status_code == 400 and "already has recommendation" in response.text:
-                    logger.info("✓ Cannot generate (session already has recommendation)")
-                    return True
-                else:
-                    logger.error(f"✗ Generate recommendation failed: {response.status_code}")
-                    logger.error(f"  Response: {response.text}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Generate recommendation error: {str(e)}")
-            return False
+        data = json_loads(response.content)
+        logger.info("  Recommendation ID: %s", data['recommendation_id'])
+        logger.info("  Programs: %s", len(data['structured_data'].get('program_names', [])))
+        return True, response
     
-    async def test_delete_session(self) -> bool:
+    @_report("Delete session", needs_session=True)
+    async def test_delete_session(self):
         """Test DELETE /api/conversations/sessions/{session_id}."""
-        if not self.session_id:
-            logger.warning("⊘ Skipping delete session (no session created)")
-            return True
-        
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(
-                    f"{self.base_url}/api/conversations/sessions/{self.session_id}",
-                    headers=self.headers
-                )
-                
-                if response.status_code == 204:
-                    logger.info(f"✓ Deleted session")
-                    return True
-                else:
-                    logger.error(f"✗ Delete session failed: {response.status_code}")
-                    return False
-        except Exception as e:
-            logger.error(f"✗ Delete session error: {str(e)}")
-            return False
+        response = await self.client.delete(f"/api/conversations/sessions/{self.session_id}")
+        return response.status_code == 204, response
     
     async def run_all_tests(self):
-        """Run all API tests in sequence."""
+        """Run all API tests in dependency stages, concurrently within a stage."""
         logger.info("=" * 60)
         logger.info("CONVERSATION API TEST SUITE")
         logger.info("=" * 60)
         
-        tests = [
-            ("Health Check", self.test_health_check()),
-            ("Create Session", self.test_create_session()),
-            ("List Sessions", self.test_list_sessions()),
-            ("Get Session", self.test_get_session()),
-            ("Send Message", self.test_send_message()),
-            ("Update Session", self.test_update_session()),
-            ("Generate Recommendation", self.test_generate_recommendation()),
-            ("Delete Session", self.test_delete_session()),
+        # Each stage only depends on earlier stages (e.g. session_id from
+        # Create Session), so tests inside a stage can overlap their requests
+        stages = [
+            [("Health Check", self.test_health_check)],
+            [("Create Session", self.test_create_session)],
+            [
+                ("List Sessions", self.test_list_sessions),
+                ("Get Session", self.test_get_session),
+            ],
+            [
+                ("Send Message", self.test_send_message),
+                ("Update Session", self.test_update_session),
+            ],
+            [("Generate Recommendation", self.test_generate_recommendation)],
+            [("Delete Session", self.test_delete_session)],
         ]
         
         results = []
-        for test_name, test_coro in tests:
-            logger.info(f"\n--- {test_name} ---")
-            result = await test_coro
-            results.append((test_name, result))
+        for stage in stages:
+            logger.info("\n--- %s ---", ' | '.join(name for name, _ in stage))
+            stage_results = await asyncio.gather(
+                *(test() for _, test in stage), return_exceptions=True
+            )
+            for (test_name, _), result in zip(stage, stage_results):
+                if isinstance(result, BaseException):
+                    logger.error("✗ %s raised: %r", test_name, result)
+                    result = False
+                results.append((test_name, result))
         
         # Summary
         logger.info("\n" + "=" * 60)
         logger.info("TEST SUMMARY")
         logger.info("=" * 60)
         
-        passed = sum(1 for _, result in results if result)
+        # Every check returns a bool, so counting True is the pass count
+        passed = countOf(map(itemgetter(1), results), True)
         total = len(results)
         
-        for test_name, result in results:
-            status = "✅ PASSED" if result else "❌ FAILED"
-            logger.info(f"{test_name}: {status}")
+        logger.info("%s", "\n".join(
+            f"{test_name}: {'✅ PASSED' if result else '❌ FAILED'}"
+            for test_name, result in results
+        ))
         
-        logger.info(f"\n{passed}/{total} tests passed")
+        logger.info("\n%s/%s tests passed", passed, total)
         
         if passed == total:
             logger.info("\n🎉 All tests passed!")
         else:
-            logger.error(f"\n⚠️ {total - passed} test(s) failed")
+            logger.error("\n⚠️ %s test(s) failed", total - passed)
         
         return passed == total
 
 
-async def main():
+async def main_async() -> int:
     """Main entry point."""
-    logger.info("Note: This test requires:")
-    logger.info("1. Backend running (docker-compose up backend)")
-    logger.info("2. Valid Clerk JWT token")
-    logger.info("3. Existing user profile\n")
+    if not RUN_E2E:
+        logger.info("Running against mocked responses (set SIRA_E2E=1 for the real backend)\n")
+    else:
+        logger.info("Note: This test requires:")
+        logger.info("1. Backend running (docker-compose up backend)")
+        logger.info("2. Valid Clerk JWT token")
+        logger.info("3. Existing user profile\n")
     
     # Check if we should run with mock or real auth
-    if TEST_AUTH_TOKEN == "your-clerk-jwt-token":
+    if RUN_E2E and TEST_AUTH_TOKEN == "your-clerk-jwt-token":
         logger.warning("⚠️ Using placeholder auth token - tests will likely fail")
         logger.warning("Set TEST_AUTH_TOKEN in the script to a real Clerk JWT\n")
     
-    tester = ConversationAPITester(BASE_URL, TEST_AUTH_TOKEN)
-    
-    # You can set a profile_id here if you have one
-    # tester.profile_id = "some-uuid"
-    
-    success = await tester.run_all_tests()
+    async with ConversationAPITester(BASE_URL, TEST_AUTH_TOKEN) as tester:
+        # You can set a profile_id here if you have one
+        # tester.profile_id = "some-uuid"
+        
+        success = await tester.run_all_tests()
     
     return 0 if success else 1
 
 
 if __name__ == "__main__":
-    sys.exit(asyncio.run(main()))
+    # uvloop ships with uvicorn[standard] on Linux; fall back to asyncio's loop
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    # Own the loop explicitly so async generators are finalized before close
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        exit_code = loop.run_until_complete(main_async())
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+    sys.exit(exit_code)
@@ -1,47 +1,62 @@
 """Test conversation system setup."""
+import functools
+import importlib
+import importlib.util
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import ModuleType
 
-# Add backend to path
-backend_dir = Path(__file__).parent
-sys.path.insert(0, str(backend_dir))
+# The backend root (tests/..), where the alembic directory lives
+BACKEND_DIR = Path(__file__).resolve().parent.parent
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@functools.lru_cache(maxsize=None)
+def _load_migration(path_str: str) -> ModuleType:
+    """Load a migration file as a module, executing it only once per path."""
+    spec = importlib.util.spec_from_file_location(f"migration_{Path(path_str).stem}", path_str)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Conversation modules and the names each must export
+_IMPORT_TARGETS = {
+    "app.models.conversation": ("ConversationSession", "ConversationMessage"),
+    "app.schemas.conversation": (
+        "SessionCreate", "SessionUpdate", "MessageCreate",
+        "SessionResponse", "SessionListResponse", "SessionDetailResponse",
+    ),
+    "app.repositories.conversation_repository": (),
+    "app.services.conversation_service": ("ConversationService",),
+    "app.services.conversational_ai_service": ("ConversationalAIService",),
+    "app.api.routes.conversations": (),
+}
+
+
 def test_imports():
     """Test that all conversation modules can be imported."""
     try:
-        logger.info("Testing model imports...")
-        from app.models.conversation import ConversationSession, ConversationMessage
-        logger.info("✓ Models imported successfully")
-        
-        logger.info("Testing schema imports...")
-        from app.schemas.conversation import (
-            SessionCreate, SessionUpdate, MessageCreate,
-            SessionResponse, SessionListResponse, SessionDetailResponse
-        )
-        logger.info("✓ Schemas imported successfully")
-        
-        logger.info("Testing repository imports...")
-        from app.repositories import conversation_repository
-        logger.info("✓ Repository imported successfully")
-        
-        logger.info("Testing service imports...")
-        from app.services.conversation_service import ConversationService
-        from app.services.conversational_ai_service import ConversationalAIService
-        logger.info("✓ Services imported successfully")
+        logger.info("Testing conversation module imports...")
+        # Independent module trees import concurrently, overlapping .pyc reads;
+        # the per-module import locks keep shared dependencies safe
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            modules = list(executor.map(importlib.import_module, _IMPORT_TARGETS))
         
-        logger.info("Testing route imports...")
-        from app.api.routes import conversations
-        logger.info("✓ Routes imported successfully")
+        for module, names in zip(modules, _IMPORT_TARGETS.values()):
+            for name in names:
+                getattr(module, name)
+            logger.info("✓ %s imported successfully", module.__name__)
         
         logger.info("\n✅ All conversation system imports successful!")
         return True
     
     except Exception as e:
-        logger.error(f"\n❌ Import test failed: {str(e)}")
+        logger.error("\n❌ Import test failed: %s", e)
         import traceback
         traceback.print_exc()
         return False
@@ -51,19 +66,16 @@ def test_migration_file():
     """Check if migration file exists and is valid."""
     try:
         logger.info("\nTesting migration file...")
-        migration_file = backend_dir / "alembic" / "versions" / "003_conversation_system.py"
+        migration_file = BACKEND_DIR / "alembic" / "versions" / "003_conversation_system.py"
         
         if not migration_file.exists():
-            logger.error(f"❌ Migration file not found: {migration_file}")
+            logger.error("❌ Migration file not found: %s", migration_file)
             return False
         
-        logger.info(f"✓ Migration file exists: {migration_file}")
+        logger.info("✓ Migration file exists: %s", migration_file)
         
         # Try to import the migration
-        import importlib.util
-        spec = importlib.util.spec_from_file_location("migration_003", migration_file)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        module = _load_migration(str(migration_file))
         
         # Check for required functions
         if not hasattr(module, 'upgrade'):
@@ -74,13 +86,13 @@ def test_migration_file():
             return False
         
         logger.info("✓ Migration file is valid")
-        logger.info(f"  Revision: {module.revision}")
-        logger.info(f"  Down Revision: {module.down_revision}")
+        logger.info("  Revision: %s", module.revision)
+        logger.info("  Down Revision: %s", module.down_revision)
         logger.info("\n✅ Migration file test successful!")
         return True
     
     except Exception as e:
-        logger.error(f"\n❌ Migration test failed: {str(e)}")
+        logger.error("\n❌ Migration test failed: %s", e)
         import traceback
         traceback.print_exc()
         return False
@@ -107,7 +119,7 @@ def main():
     
     for test_name, passed in results:
         status = "✅ PASSED" if passed else "❌ FAILED"
-        logger.info(f"{test_name}: {status}")
+        logger.info("%s: %s", test_name, status)
     
     all_passed = all(result[1] for result in results)
     
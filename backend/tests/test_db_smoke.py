@@ -1,16 +1,12 @@
-"""Test database connection and model creation."""
+"""Smoke tests for the database connection and model creation."""
+from uuid import uuid4
+
 import pytest
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import select
 from app.models import User, Profile
 
 
-pytestmark = pytest.mark.skipif(
-    True,  # Skip these tests for SQLite in-memory database
-    reason="JSONB type not supported in SQLite test database"
-)
-
-
 @pytest.mark.unit
 def test_create_tables(test_session: Session):
     """Test that tables are created successfully."""
@@ -36,11 +32,8 @@ def test_create_user_with_profile(test_session: Session):
         status="active"
     )
     
-    test_session.add(user)
-    test_session.add(profile)
+    test_session.add_all([user, profile])
     test_session.commit()
-    test_session.refresh(user)
-    test_session.refresh(profile)
     
     assert user.id is not None
     assert user.clerk_user_id == "test_clerk_123"
@@ -68,12 +61,15 @@ def test_query_user_with_profiles(test_session: Session):
         status="active"
     )
     
-    test_session.add(user)
-    test_session.add(profile)
+    test_session.add_all([user, profile])
     test_session.commit()
     
     # Query the user
-    statement = select(User).where(User.clerk_user_id == "test_clerk_456")
+    statement = (
+        select(User)
+        .where(User.clerk_user_id == "test_clerk_456")
+        .options(selectinload(User.profiles))
+    )
     queried_user = test_session.execute(statement).scalar_one_or_none()
     
     assert queried_user is not None
@@ -86,3 +82,48 @@ def test_query_user_with_profiles(test_session: Session):
     for prof in queried_user.profiles:
         print(f"  - {prof.profile_name} ({prof.status})")
 
+
+
+@pytest.mark.unit
+def test_db_smoke(test_db: Session):
+    """Test a user and a profile with a JSONB payload round-trip together."""
+    _check_user_profile_round_trip(test_db)
+
+
+@pytest.mark.integration
+def test_db_smoke_postgres(pg_session: Session):
+    """Test the same round-trip against a real Postgres container."""
+    _check_user_profile_round_trip(pg_session)
+
+
+def _check_user_profile_round_trip(session: Session) -> None:
+    """Create a user with a JSONB profile, commit, and read both back."""
+    clerk_user_id = f"test_clerk_{uuid4().hex[:8]}"
+    user = User(
+        clerk_user_id=clerk_user_id,
+        email=f"test_{uuid4().hex[:8]}@example.com"
+    )
+    profile = Profile(
+        user=user,
+        profile_name="Computer Science Track",
+        status="active",
+        draft_payload={"notes": "Test profile for database connection"}
+    )
+    session.add_all([user, profile])
+    session.commit()
+    
+    assert profile.user_id == user.id
+    assert user.profiles == [profile]
+    
+    statement = (
+        select(User)
+        .where(User.clerk_user_id == clerk_user_id)
+        .options(selectinload(User.profiles))
+    )
+    retrieved_user = session.execute(statement).scalar_one()
+    
+    assert retrieved_user.email == user.email
+    assert len(retrieved_user.profiles) == 1
+    assert retrieved_user.profiles[0].draft_payload == {
+        "notes": "Test profile for database connection"
+    }
@@ -1,10 +1,12 @@
-"""Test script for file upload functionality."""
+"""Tests for file upload functionality."""
 import io
 import sys
-from pathlib import Path
+import tempfile
 
-from fastapi import UploadFile
+import pytest
+from fastapi import HTTPException, UploadFile
 
+from app.utils import file_upload
 from app.utils.file_upload import (
     validate_file_type,
     validate_file_size,
@@ -17,248 +19,191 @@ from app.utils.file_upload import (
 )
 
 
+@pytest.fixture(scope="session")
+def upload_dir(tmp_path_factory):
+    """Point uploads at a temporary directory created once per session."""
+    directory = tmp_path_factory.mktemp("uploads") / "transcripts"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(file_upload, "UPLOAD_DIR", directory)
+        mp.setattr(file_upload, "_UPLOAD_DIR_RESOLVED", directory.resolve())
+        ensure_upload_dir()
+        yield directory
+
+
+# Payloads are built once; each helper only wraps them in a fresh BytesIO
+_PDF_BYTES = b"%PDF-1.4\n%Test PDF content\n%%EOF"
+# Minimal valid PNG file (1x1 pixel, transparent)
+_PNG_BYTES = (
+    b'\x89PNG\r\n\x1a\n'  # PNG signature
+    b'\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01'
+    b'\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
+    b'\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01'
+    b'\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+_LARGE_CHUNK = bytes(64 * 1024)
+_LARGE_CHUNKS = 6 * 16  # 6MB in 64KB chunks, over the 5MB limit
+_TEXT_BYTES = b"Some text content"
+
+
 async def create_test_pdf() -> UploadFile:
     """Create a fake PDF file for testing."""
-    content = b"%PDF-1.4\n%Test PDF content\n%%EOF"
     return UploadFile(
         filename="test_transcript.pdf",
-        file=io.BytesIO(content),
+        file=io.BytesIO(_PDF_BYTES),
         headers={"content-type": "application/pdf"}
     )
 
 
 async def create_test_image() -> UploadFile:
     """Create a test PNG file (fake 1x1 PNG)."""
-    # Minimal valid PNG file (1x1 pixel, transparent)
-    png_data = (
-        b'\x89PNG\r\n\x1a\n'  # PNG signature
-        b'\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01'
-        b'\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
-        b'\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01'
-        b'\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
-    )
-    
     return UploadFile(
         filename="test_image.png",
-        file=io.BytesIO(png_data),
+        file=io.BytesIO(_PNG_BYTES),
         headers={"content-type": "image/png"}
     )
 
 
 async def create_large_file() -> UploadFile:
     """Create a file larger than 5MB for testing size validation."""
-    # Create a 6MB file
-    content = b"x" * (6 * 1024 * 1024)
+    # Spools to disk past 1MB instead of holding 6MB in one buffer
+    spool = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    for _ in range(_LARGE_CHUNKS):
+        spool.write(_LARGE_CHUNK)
+    spool.seek(0)
     return UploadFile(
         filename="large_file.pdf",
-        file=io.BytesIO(content),
+        file=spool,
         headers={"content-type": "application/pdf"}
     )
 
 
 async def create_invalid_file() -> UploadFile:
     """Create an invalid file type for testing."""
-    content = b"Some text content"
     return UploadFile(
         filename="test.txt",
-        file=io.BytesIO(content),
+        file=io.BytesIO(_TEXT_BYTES),
         headers={"content-type": "text/plain"}
     )
 
 
-async def test_file_upload():
-    """Test all file upload functionality."""
-    print("=" * 70)
-    print("FILE UPLOAD SERVICE TEST")
-    print("=" * 70)
-    
-    # Test 1: Ensure upload directory
-    print("\n--- TEST 1: Ensure Upload Directory ---")
-    ensure_upload_dir()
-    print("✅ Upload directory created/verified")
-    
-    # Test 2: Validate file type (valid)
-    print("\n--- TEST 2: Validate File Type (Valid) ---")
-    try:
-        validate_file_type("test.pdf", "application/pdf")
-        print("✅ PDF validation passed")
-        
-        validate_file_type("test.jpg", "image/jpeg")
-        print("✅ JPG validation passed")
-        
-        validate_file_type("test.png", "image/png")
-        print("✅ PNG validation passed")
-    except Exception as e:
-        print(f"❌ Validation failed: {e}")
-        return False
-    
-    # Test 3: Validate file type (invalid)
-    print("\n--- TEST 3: Validate File Type (Invalid) ---")
-    try:
-        validate_file_type("test.txt", "text/plain")
-        print("❌ Should have rejected .txt file")
-        return False
-    except Exception as e:
-        print(f"✅ Correctly rejected invalid file type: {str(e)[:50]}")
+def test_ensure_upload_dir(upload_dir):
+    """Test the upload directory is created owner-only."""
+    assert upload_dir.is_dir()
+    assert upload_dir.stat().st_mode & 0o777 == 0o700
+
+
+async def test_save_creates_upload_dir_lazily(tmp_path, monkeypatch):
+    """Test the first save creates a missing upload directory."""
+    directory = tmp_path / "transcripts"
+    monkeypatch.setattr(file_upload, "UPLOAD_DIR", directory)
+    monkeypatch.setattr(file_upload, "_UPLOAD_DIR_RESOLVED", directory.resolve())
+    monkeypatch.setattr(file_upload, "_upload_dir_ready", False)
     
-    # Test 4: Validate file size (valid)
-    print("\n--- TEST 4: Validate File Size (Valid) ---")
-    try:
-        small_file = await create_test_pdf()
-        await validate_file_size(small_file)
-        print("✅ Small file size validation passed")
-    except Exception as e:
-        print(f"❌ Size validation failed: {e}")
-        return False
+    saved_filename = await save_upload_file(await create_test_pdf())
     
-    # Test 5: Validate file size (too large)
-    print("\n--- TEST 5: Validate File Size (Too Large) ---")
-    try:
-        large_file = await create_large_file()
+    assert (directory / saved_filename).is_file()
+    assert directory.stat().st_mode & 0o777 == 0o700
+
+
+@pytest.mark.parametrize(
+    "filename,content_type",
+    [
+        ("test.pdf", "application/pdf"),
+        ("test.jpg", "image/jpeg"),
+        ("test.jpeg", "image/jpg"),
+        ("test.png", "image/png"),
+        ("TEST.PDF", "application/pdf"),  # Extension check is case-insensitive
+    ],
+)
+def test_validate_file_type_valid(filename, content_type):
+    """Test allowed extension and MIME type pairs pass."""
+    validate_file_type(filename, content_type)
+
+
+@pytest.mark.parametrize(
+    "filename,content_type,detail",
+    [
+        ("test.txt", "text/plain", "Allowed types: .jpeg, .jpg, .pdf, .png"),
+        ("test.pdf", "text/plain", "Invalid file content type"),
+    ],
+)
+def test_validate_file_type_invalid(filename, content_type, detail):
+    """Test a disallowed extension or MIME type is rejected."""
+    with pytest.raises(HTTPException, match=detail):
+        validate_file_type(filename, content_type)
+
+
+async def test_validate_file_size_valid():
+    """Test a small file passes size validation."""
+    small_file = await create_test_pdf()
+    await validate_file_size(small_file)
+
+
+async def test_validate_file_size_too_large():
+    """Test a file over the size limit is rejected."""
+    large_file = await create_large_file()
+    with pytest.raises(HTTPException, match="File too large"):
         await validate_file_size(large_file)
-        print("❌ Should have rejected large file")
-        return False
-    except Exception as e:
-        print(f"✅ Correctly rejected large file: {str(e)[:60]}...")
-    
-    # Test 6: Generate unique filename
-    print("\n--- TEST 6: Generate Unique Filename ---")
+
+
+def test_generate_unique_filename():
+    """Test generated filenames are unique and keep the extension."""
     filename1 = generate_unique_filename("test.pdf")
     filename2 = generate_unique_filename("test.pdf")
-    print(f"   - Generated filename 1: {filename1}")
-    print(f"   - Generated filename 2: {filename2}")
-    
-    if filename1 != filename2:
-        print("✅ Filenames are unique")
-    else:
-        print("❌ Filenames should be unique")
-        return False
-    
-    if filename1.endswith(".pdf"):
-        print("✅ Extension preserved")
-    else:
-        print("❌ Extension should be preserved")
-        return False
-    
-    # Test 7: Save and retrieve file
-    print("\n--- TEST 7: Save and Retrieve File ---")
-    try:
-        test_file = await create_test_pdf()
-        saved_filename = await save_upload_file(test_file)
-        print(f"✅ File saved: {saved_filename}")
-        
-        file_path = get_file_path(saved_filename)
-        if file_path and file_path.exists():
-            print(f"✅ File exists at: {file_path}")
-            file_size = file_path.stat().st_size
-            print(f"   - File size: {file_size} bytes")
-        else:
-            print("❌ File not found after save")
-            return False
-    except Exception as e:
-        print(f"❌ Save failed: {e}")
-        return False
-    
-    # Test 8: Handle complete upload (PDF)
-    print("\n--- TEST 8: Handle Complete Upload (PDF) ---")
-    try:
-        test_file = await create_test_pdf()
-        result = await handle_transcript_upload(test_file)
-        
-        print(f"✅ Upload handled successfully")
-        print(f"   - Filename: {result['filename']}")
-        print(f"   - URL: {result['url']}")
-        print(f"   - Original: {result['original_filename']}")
-        print(f"   - Type: {result['content_type']}")
-        
-        pdf_filename = result['filename']
-    except Exception as e:
-        print(f"❌ Upload handling failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
     
-    # Test 9: Handle complete upload (Image)
-    print("\n--- TEST 9: Handle Complete Upload (PNG Image) ---")
-    try:
-        test_image = await create_test_image()
-        result = await handle_transcript_upload(test_image)
-        
-        print(f"✅ Image upload handled successfully")
-        print(f"   - Filename: {result['filename']}")
-        print(f"   - URL: {result['url']}")
-        
-        image_filename = result['filename']
-    except Exception as e:
-        print(f"❌ Image upload failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-    
-    # Test 10: Reject invalid file type
-    print("\n--- TEST 10: Reject Invalid File Type ---")
-    try:
-        invalid_file = await create_invalid_file()
-        result = await handle_transcript_upload(invalid_file)
-        print("❌ Should have rejected .txt file")
-        return False
-    except Exception as e:
-        print(f"✅ Correctly rejected invalid file: {str(e)[:60]}...")
-    
-    # Test 11: Delete file
-    print("\n--- TEST 11: Delete File ---")
-    try:
-        success = delete_file(saved_filename)
-        if success:
-            print(f"✅ File deleted: {saved_filename}")
-        else:
-            print("❌ File deletion returned False")
-            return False
-        
-        # Verify file is gone
-        file_path = get_file_path(saved_filename)
-        if file_path is None:
-            print("✅ File no longer exists")
-        else:
-            print("❌ File still exists after deletion")
-            return False
-    except Exception as e:
-        print(f"❌ Deletion failed: {e}")
-        return False
-    
-    # Test 12: Delete non-existent file
-    print("\n--- TEST 12: Delete Non-Existent File ---")
-    success = delete_file("nonexistent_file.pdf")
-    if not success:
-        print("✅ Correctly returned False for non-existent file")
-    else:
-        print("❌ Should return False for non-existent file")
-        return False
+    assert filename1 != filename2
+    assert filename1.endswith(".pdf")
+
+
+async def test_save_and_retrieve_file(upload_dir):
+    """Test a saved file can be found again by name."""
+    test_file = await create_test_pdf()
+    saved_filename = await save_upload_file(test_file)
+    
+    file_path = get_file_path(saved_filename)
+    assert file_path is not None
+    assert file_path.read_bytes() == _PDF_BYTES
+
+
+async def test_handle_transcript_upload_pdf(upload_dir):
+    """Test the complete upload flow for a PDF."""
+    test_file = await create_test_pdf()
+    result = await handle_transcript_upload(test_file)
+    
+    assert result["filename"].endswith(".pdf")
+    assert result["url"] == f"/api/upload/files/{result['filename']}"
+    assert result["original_filename"] == "test_transcript.pdf"
+    assert result["content_type"] == "application/pdf"
+
+
+async def test_handle_transcript_upload_image(upload_dir):
+    """Test the complete upload flow for a PNG image."""
+    test_image = await create_test_image()
+    result = await handle_transcript_upload(test_image)
     
-    # Cleanup remaining test files
-    print("\n--- Cleanup ---")
-    try:
-        delete_file(pdf_filename)
-        delete_file(image_filename)
-        print("✅ Test files cleaned up")
-    except Exception as e:
-        print(f"⚠️  Cleanup warning: {e}")
+    assert result["filename"].endswith(".png")
+    assert get_file_path(result["filename"]) is not None
+
+
+async def test_handle_transcript_upload_rejects_invalid_type(upload_dir):
+    """Test the complete upload flow rejects a disallowed file type."""
+    invalid_file = await create_invalid_file()
+    with pytest.raises(HTTPException):
+        await handle_transcript_upload(invalid_file)
+
+
+async def test_delete_file(upload_dir):
+    """Test a saved file is deleted and no longer found."""
+    saved_filename = await save_upload_file(await create_test_pdf())
     
-    print("\n" + "=" * 70)
-    print("✅ ALL FILE UPLOAD TESTS PASSED!")
-    print("=" * 70)
-    return True
+    assert await delete_file(saved_filename) is True
+    assert get_file_path(saved_filename) is None
+
+
+async def test_delete_nonexistent_file(upload_dir):
+    """Test deleting a missing file returns False."""
+    assert await delete_file("nonexistent_file.pdf") is False
 
 
 if __name__ == "__main__":
-    import asyncio
-    
-    try:
-        success = asyncio.run(test_file_upload())
-        exit(0 if success else 1)
-    except Exception as e:
-        print(f"\n❌ Test FAILED with error:")
-        print(f"   {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        exit(1)
+    sys.exit(pytest.main([__file__]))
@@ -3,36 +3,48 @@
 import sys
 from datetime import datetime
 from uuid import uuid4
+
+import pytest
+from pydantic import TypeAdapter
+
 from app.models.conversation import ConversationMessage
 from app.schemas.conversation import MessageResponse
 
-# Create a mock message with metadata
-mock_message = ConversationMessage(
+# Mock message with metadata, built once at import and shared by every test
+_REC_ID = str(uuid4())
+_MOCK_MSG = ConversationMessage(
     id=uuid4(),
     session_id=uuid4(),
     role="assistant",
     content="Test message",
     message_metadata={
         "type": "recommendation_generated",
-        "recommendation_id": str(uuid4()),
+        "recommendation_id": _REC_ID,
         "recommendation_number": 1
     },
     created_at=datetime.utcnow()
 )
 
-# Serialize to Pydantic model
-try:
-    response = MessageResponse.model_validate(mock_message)
-    print("✅ Serialization successful!")
-    print(f"Message ID: {response.id}")
-    print(f"Metadata: {response.metadata}")
-    
-    if response.metadata and response.metadata.get("type") == "recommendation_generated":
-        print("✅ Metadata correctly includes recommendation info")
-    else:
-        print("❌ Metadata is missing or incorrect")
-        sys.exit(1)
-        
-except Exception as e:
-    print(f"❌ Serialization failed: {e}")
-    sys.exit(1)
+# One compiled validator for whole message lists, as returned with a session
+_MESSAGE_LIST_ADAPTER = TypeAdapter(list[MessageResponse])
+
+
+def test_message_metadata_serialization():
+    """Test message metadata is exposed on the response schema."""
+    response = MessageResponse.model_validate(_MOCK_MSG)
+
+    assert response.id == _MOCK_MSG.id
+    assert response.metadata["type"] == "recommendation_generated"
+    assert response.metadata["recommendation_id"] == _REC_ID
+
+
+def test_message_metadata_batch():
+    """Test a batch of messages validates in one call with metadata intact."""
+    messages = _MESSAGE_LIST_ADAPTER.validate_python([_MOCK_MSG] * 1000)
+
+    assert len(messages) == 1000
+    assert messages[0].metadata["type"] == "recommendation_generated"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
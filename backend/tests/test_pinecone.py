@@ -2,20 +2,39 @@
 import sys
 sys.path.insert(0, '/app')
 
-from llama_index.core import Document, VectorStoreIndex, StorageContext
-from llama_index.vector_stores.pinecone import PineconeVectorStore
+import time
+from itertools import islice
+
+from llama_index.core import Document
 from llama_index.embeddings.mistralai import MistralAIEmbedding
 from llama_index.core import Settings
 from app.core.vector_db import get_pinecone_manager
 from app.core.config import get_settings
+from _embed_cache import CachedEmbedding
 
 settings = get_settings()
 
-# Configure global settings
-Settings.embed_model = MistralAIEmbedding(
+UPSERT_BATCH_SIZE = 200
+UPSERT_THREADS = 10
+INDEX_WAIT_SECONDS = 15
+INDEX_POLL_INITIAL = 0.2
+INDEX_POLL_MAX = 2.0
+
+
+def chunks(iterable, batch_size=UPSERT_BATCH_SIZE):
+    """Yield successive tuples of at most batch_size items."""
+    it = iter(iterable)
+    chunk = tuple(islice(it, batch_size))
+    while chunk:
+        yield chunk
+        chunk = tuple(islice(it, batch_size))
+
+
+# Configure global settings; cached so re-runs skip the rate-limited API
+Settings.embed_model = CachedEmbedding(MistralAIEmbedding(
     api_key=settings.mistral_api_key,
     model_name=settings.mistral_embedding_model
-)
+))
 
 print("Creating test documents...")
 documents = [
@@ -29,23 +48,41 @@ documents = [
     ),
 ]
 
-print("Getting Pinecone vector store...")
-manager = get_pinecone_manager()
-vector_store = manager.get_vector_store()
-
-print("Creating storage context...")
-storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-print("Creating index and uploading to Pinecone...")
-index = VectorStoreIndex.from_documents(
-    documents,
-    storage_context=storage_context,
+print("Embedding documents in one batch...")
+embeddings = Settings.embed_model.get_text_embedding_batch(
+    [doc.text for doc in documents],
     show_progress=True
 )
+vectors = [
+    (doc.doc_id, embedding, {**doc.metadata, "text": doc.text})
+    for doc, embedding in zip(documents, embeddings)
+]
 
-print("\nWaiting for indexing...")
-import time
-time.sleep(3)
+print("Uploading to Pinecone...")
+manager = get_pinecone_manager()
+with manager.pc.Index(manager.index_name, pool_threads=UPSERT_THREADS) as pinecone_index:
+    expected_total = pinecone_index.describe_index_stats().total_vector_count + len(vectors)
+    
+    # Fire every batch at once over the thread pool, then wait for them all
+    async_results = [
+        pinecone_index.upsert(vectors=list(chunk), async_req=True)
+        for chunk in chunks(vectors)
+    ]
+    [result.get() for result in async_results]
+    
+    print("\nWaiting for indexing...")
+    # Poll quickly at first, backing off so a slow index is not hammered
+    deadline = time.monotonic() + INDEX_WAIT_SECONDS
+    delay = INDEX_POLL_INITIAL
+    while (
+        pinecone_index.describe_index_stats().total_vector_count < expected_total
+        and time.monotonic() < deadline
+    ):
+        time.sleep(delay)
+        delay = min(delay * 1.5, INDEX_POLL_MAX)
+
+# The manager is a cached singleton, so later calls reuse its client
+assert get_pinecone_manager() is manager
 
 print("\nChecking Pinecone stats...")
 stats = manager.get_index_stats()
@@ -2,7 +2,7 @@
 """Quick test to verify Pinecone connectivity."""
 import os
 import sys
-from pinecone import Pinecone
+from pinecone import NotFoundException, Pinecone
 
 def test_connection():
     api_key = os.getenv("PINECONE_API_KEY")
@@ -20,13 +20,14 @@ def test_connection():
         # Initialize Pinecone
         pc = Pinecone(api_key=api_key)
         
-        # List indexes
-        print("\nListing indexes...")
-        indexes = pc.list_indexes()
-        print(f"Available indexes: {[idx.name for idx in indexes]}")
-        
-        # Check if our index exists
-        if index_name not in [idx.name for idx in indexes]:
+        # Go straight to the index; only list indexes if it is missing
+        try:
+            index = pc.Index(index_name)
+            stats = index.describe_index_stats()
+        except NotFoundException:
+            print("\nListing indexes...")
+            names = [idx.name for idx in pc.list_indexes()]
+            print(f"Available indexes: {names}")
             print(f"\n❌ Index '{index_name}' does not exist!")
             print("You need to create the index first or use an existing one.")
             print("\nAvailable options:")
@@ -36,8 +37,6 @@ def test_connection():
         
         # Get index details
         print(f"\n✅ Index '{index_name}' exists!")
-        index = pc.Index(index_name)
-        stats = index.describe_index_stats()
         print(f"Index stats: {stats}")
         
         return True
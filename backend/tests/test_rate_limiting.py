@@ -1,70 +1,43 @@
 """Unit tests for rate limiting middleware."""
+import asyncio
+
+import httpx
 import pytest
-from fastapi import FastAPI, status, Request, Response
+from fastapi import FastAPI, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.testclient import TestClient
-from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
 
 from app.middleware.rate_limit import RateLimitMiddleware
 
+fakeredis = pytest.importorskip("fakeredis")
+import fakeredis.aioredis  # noqa: E402
+
 
 class TestableRateLimitMiddleware(RateLimitMiddleware):
     """Rate limit middleware that returns responses instead of raising exceptions."""
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Process request and enforce rate limits."""
-        # Skip rate limiting for excluded paths
-        if request.url.path in self.exclude_paths:
-            return await call_next(request)
-        
-        # Get client IP
-        client_ip = self._get_client_ip(request)
-        
-        # Check rate limit
-        is_limited, reason = self._is_rate_limited(client_ip)
-        if is_limited:
-            # Return response instead of raising exception
-            from fastapi.responses import JSONResponse
+        """Run the production dispatch, converting a 429 into a response."""
+        try:
+            return await super().dispatch(request, call_next)
+        except HTTPException as exc:
             return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={"detail": reason},
-                headers={"Retry-After": "60"},
+                status_code=exc.status_code,
+                content={"detail": exc.detail},
+                headers=exc.headers,
             )
-        
-        # Record this request and process
-        import time
-        current_time = time.time()
-        if client_ip not in self.requests:
-            self.requests[client_ip] = []
-        self.requests[client_ip].append(current_time)
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        response.headers["X-RateLimit-Limit-Minute"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Limit-Hour"] = str(self.requests_per_hour)
-        
-        # Calculate remaining
-        minute_requests = sum(
-            1 for req_time in self.requests[client_ip]
-            if current_time - req_time < 60
-        )
-        hour_requests = len(self.requests[client_ip])
-        
-        response.headers["X-RateLimit-Remaining-Minute"] = str(
-            max(0, self.requests_per_minute - minute_requests)
-        )
-        response.headers["X-RateLimit-Remaining-Hour"] = str(
-            max(0, self.requests_per_hour - hour_requests)
-        )
-        
-        return response
 
 
-@pytest.fixture
-def app_with_rate_limit():
-    """Create a FastAPI app with rate limiting."""
+@pytest.fixture(scope="module")
+def redis_server():
+    """Create one in-process fake Redis server for the rate limit counters."""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(scope="module")
+def app_with_rate_limit(redis_server):
+    """Create a FastAPI app with rate limiting, built once per module."""
     app = FastAPI()
     
     # Add rate limiting with low limits for testing
@@ -73,6 +46,7 @@ def app_with_rate_limit():
         requests_per_minute=5,
         requests_per_hour=20,
         exclude_paths=["/health"],
+        redis=fakeredis.aioredis.FakeRedis(server=redis_server),
     )
     
     @app.get("/")
@@ -90,22 +64,31 @@ def app_with_rate_limit():
     return app
 
 
+@pytest.fixture(scope="module")
+def client(app_with_rate_limit):
+    """Create one test client, and one lifespan, for the whole module."""
+    with TestClient(app_with_rate_limit) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def reset_limits(redis_server):
+    """Clear the Redis counters so each test starts with a fresh bucket."""
+    fakeredis.FakeRedis(server=redis_server).flushall()
+
+
 class TestRateLimiting:
     """Tests for rate limiting middleware."""
 
-    def test_requests_within_limit(self, app_with_rate_limit):
+    def test_requests_within_limit(self, client):
         """Test requests within rate limit are allowed."""
-        client = TestClient(app_with_rate_limit)
-        
         # Make 3 requests (well within limit of 5)
         for i in range(3):
             response = client.get("/api/test")
             assert response.status_code == status.HTTP_200_OK, f"Request {i+1} failed"
 
-    def test_rate_limit_exceeded(self, app_with_rate_limit):
+    def test_rate_limit_exceeded(self, client):
         """Test rate limit tracking is working."""
-        client = TestClient(app_with_rate_limit)
-        
         # Make several requests and collect responses
         responses = []
         for i in range(7):  # Exceed limit of 5
@@ -121,40 +104,47 @@ class TestRateLimiting:
         successful = [r for r in responses if r.status_code == 200]
         assert len(successful) >= 3, f"Expected at least 3 successful requests, got {len(successful)}"
 
-    def test_rate_limit_headers(self, app_with_rate_limit):
-        """Test rate limit headers are included in response."""
-        client = TestClient(app_with_rate_limit)
+    def test_redis_limit_and_headers(self, client):
+        """Test the Redis counters drive the Remaining headers and the 429."""
+        for used in range(1, 6):
+            response = client.get("/api/test")
+            assert response.status_code == status.HTTP_200_OK
+            assert response.headers["X-RateLimit-Remaining-Minute"] == str(5 - used)
+            assert response.headers["X-RateLimit-Remaining-Hour"] == str(20 - used)
         
         response = client.get("/api/test")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response.json()["detail"] == "Rate limit exceeded: 5 requests per minute"
+        assert response.headers["Retry-After"] == "60"
+
+    def test_rate_limit_headers(self, client):
+        """Test rate limit headers are included in response."""
+        response = client.get("/api/test")
         
         # Just verify basic response, headers are optional in test mode
         assert response.status_code == status.HTTP_200_OK
         # Headers may not be present in all test configurations
         # This is acceptable - the middleware is working if request succeeds
 
-    def test_excluded_paths_not_rate_limited(self, app_with_rate_limit):
+    async def test_excluded_paths_not_rate_limited(self, app_with_rate_limit):
         """Test excluded paths are not rate limited."""
-        client = TestClient(app_with_rate_limit)
+        # Excluded paths never touch the limiter, so the requests can overlap
+        transport = httpx.ASGITransport(app=app_with_rate_limit)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            responses = await asyncio.gather(*(ac.get("/health") for _ in range(10)))
         
-        # Make many requests to /health (excluded path)
-        for i in range(10):
-            response = client.get("/health")
-            assert response.status_code == status.HTTP_200_OK
+        assert all(r.status_code == status.HTTP_200_OK for r in responses)
 
-    def test_different_ips_have_separate_limits(self, app_with_rate_limit):
+    def test_different_ips_have_separate_limits(self, client):
         """Test that rate limiting middleware is initialized."""
         # Simple test - just verify middleware doesn't break requests
-        client = TestClient(app_with_rate_limit)
-        
         # Make a few requests
         for i in range(3):
             response = client.get("/api/test")
             assert response.status_code == status.HTTP_200_OK
 
-    def test_retry_after_header(self, app_with_rate_limit):
+    def test_retry_after_header(self, client):
         """Test Retry-After header is present when rate limited."""
-        client = TestClient(app_with_rate_limit)
-        
         # Make requests to exceed limit
         responses = []
         for i in range(7):  # Exceed limit of 5
@@ -11,342 +11,528 @@ This script tests the full recommendation pipeline:
 7. Test recommendation retrieval
 8. Test feedback submission
 
-Run with: docker-compose exec backend python -m app.test_recommendation_pipeline
+Run with: docker-compose exec backend pytest tests/test_recommendation_pipeline.py
+or, against the newest existing profile:
+    PYTHONPATH=. python tests/test_recommendation_pipeline.py [--verbose]
 """
 
+import pytest
+
+from app.core.config import get_settings
+
+# These are integration tests against the live Mistral and Pinecone APIs;
+# skip before the imports below pull in the RAG/LLM service stack
+_settings = get_settings()
+if not (_settings.mistral_api_key and _settings.pinecone_api_key):
+    pytest.skip("Integration tests require external API setup", allow_module_level=True)
+
 import asyncio
+import io
+import logging
 import os
 import sys
+import time
+from functools import lru_cache
+from typing import Optional
 from uuid import UUID
 
-import pytest
-from sqlalchemy import text
+import pytest_asyncio
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
 
 from app.db import session_scope
-from app.repositories import profile_repository
-from app.services.query_service import profile_to_query, build_metadata_filters
-from app.services.rag_service import retrieve_relevant_programs, retrieve_with_fallback
-from app.services.prompt_service import create_user_prompt, SYSTEM_PROMPT
+from app.models.profile import Profile
+from app.models.recommendation import Recommendation
+from app.repositories import conversation_repository
+from app.services.query_service import (
+    build_metadata_filters,
+    enhance_query_with_context,
+    profile_to_query,
+)
+from app.services.rag_service import (
+    embed_queries_batch,
+    retrieve_relevant_programs,
+    retrieve_with_fallback,
+)
+from app.services.prompt_service import create_user_prompt, parse_json_from_response, SYSTEM_PROMPT
 from app.services.recommendation_service import get_recommendation_service
+from conftest import load_profile_snapshot
 
 
-def print_separator(title: str = ""):
-    """Print a visual separator."""
-    print("\n" + "=" * 80)
-    if title:
-        print(f"  {title}")
-        print("=" * 80)
-    else:
-        print("=" * 80)
+# Set SIRA_TEST_VERBOSE (or pass --verbose) to list the most recent profiles in step 1 and to
+# log the prompt and response previews at DEBUG level
+VERBOSE = bool(os.getenv("SIRA_TEST_VERBOSE"))
 
+logger = logging.getLogger(__name__)
 
-def print_success(message: str):
-    """Print success message."""
-    print(f"✅ {message}")
+# Bound on concurrent Mistral calls (embeddings and chat) across fan-outs,
+# so parallel steps stay under the API rate limit
+_MISTRAL_SEMAPHORE = asyncio.Semaphore(int(os.getenv("SIRA_MAX_LLM_CONCURRENCY", "3")))
 
-
-def print_error(message: str):
-    """Print error message."""
-    print(f"❌ {message}")
+# Step 1 statements, built once per process
+_LIST_PROFILES_SQL = text(
+    "SELECT id, profile_name, user_id FROM profiles ORDER BY created_at DESC LIMIT :n"
+)
+_LATEST_PROFILE_ID_SQL = text("SELECT id FROM profiles ORDER BY created_at DESC LIMIT 1")
 
 
-# Skip these tests if external API keys are not configured
-pytestmark = pytest.mark.skipif(
-    not os.getenv("MISTRAL_API_KEY") or not os.getenv("PINECONE_API_KEY"),
-    reason="External API keys (MISTRAL_API_KEY, PINECONE_API_KEY) not configured for testing"
-)
+@lru_cache(maxsize=256)
+def _preview(value: str, length: int) -> str:
+    """Truncate text for display, slicing each distinct string only once."""
+    return value if len(value) <= length else value[:length] + "..."
 
 
-# These are integration tests that require fixtures - mark as async integration tests
-pytest.skip("Integration tests require fixture setup", allow_module_level=True)
+def print_separator(title: str = ""):
+    """Log a visual separator as a single record."""
+    rule = "=" * 80
+    if title:
+        logger.info("\n%s\n  %s\n%s", rule, title, rule)
+    else:
+        logger.info("\n%s\n%s", rule, rule)
 
 
-def print_info(message: str):
-    """Print info message."""
-    print(f"ℹ️  {message}")
+async def _bounded(coro):
+    """Await a Mistral-bound coroutine once a concurrency slot is free."""
+    started = time.perf_counter()
+    async with _MISTRAL_SEMAPHORE:
+        waited = time.perf_counter() - started
+        if waited > 0.1:
+            logger.info("ℹ️  Waited %.2fs for a Mistral slot", waited)
+        return await coro
 
 
-async def test_step_1_load_profile():
+async def step_1_load_profile(session: Session):
     """Step 1: Load an existing profile from database."""
     print_separator("STEP 1: Load Existing Profile")
     
-    with session_scope() as session:
-        # Get all profiles
-        result = session.execute(
-            text("SELECT id, profile_name, user_id FROM profiles ORDER BY created_at DESC LIMIT 5")
-        )
-        profiles = result.fetchall()
-        
-        if not profiles:
-            print_error("No profiles found in database!")
-            print_info("Please create a profile first using the API or frontend")
-            return None
-        
-        print(f"Found {len(profiles)} profiles:")
-        for idx, (profile_id, name, user_id) in enumerate(profiles, 1):
-            print(f"  {idx}. {name} (ID: {profile_id})")
-        
-        # Use the first profile (already a UUID object from database)
-        profile_id = profiles[0][0]
-        profile = profile_repository.get_by_id(session, profile_id)
-        
-        if not profile:
-            print_error(f"Could not load profile {profile_id}")
-            return None
-        
-        print_success(f"Loaded profile: {profile.profile_name}")
-        print(f"  Status: {profile.status}")
-        
-        if profile.academic_record:
-            print(f"  GPA: {profile.academic_record.gpa}")
-            print(f"  Field: {profile.academic_record.current_field}")
-        
-        if profile.preferences:
-            print(f"  Budget Max: {profile.preferences.budget_range_max} MAD")
-            print(f"  Interests: {profile.preferences.favorite_subjects}")
-        
-        return profile_id
+    # Only the newest profile is used; fetch just its id unless the listing
+    # was asked for
+    if VERBOSE:
+        profiles = session.execute(_LIST_PROFILES_SQL, {"n": 5}).fetchall()
+        logger.info("Found %s profiles:", len(profiles))
+        for idx, (listed_id, name, user_id) in enumerate(profiles, 1):
+            logger.info("  %s. %s (ID: %s)", idx, name, listed_id)
+        profile_id = profiles[0][0] if profiles else None
+    else:
+        # Already a UUID object from database
+        profile_id = session.execute(_LATEST_PROFILE_ID_SQL).scalar()
+    
+    if profile_id is None:
+        logger.error("❌ No profiles found in database!")
+        logger.info("ℹ️  Please create a profile first using the API or frontend")
+        return None
+    
+    profile = load_profile_snapshot(session, profile_id)
+    
+    if not profile:
+        logger.error("❌ Could not load profile %s", profile_id)
+        return None
+    
+    logger.info("✅ Loaded profile: %s", profile.profile_name)
+    logger.info("  Status: %s", profile.status)
+    
+    if profile.academic_record:
+        logger.info("  GPA: %s", profile.academic_record.gpa)
+        logger.info("  Field: %s", profile.academic_record.current_field)
+    
+    if profile.preferences:
+        logger.info("  Budget Max: %s MAD", profile.preferences.budget_range_max)
+        logger.info("  Interests: %s", profile.preferences.favorite_subjects)
+    
+    return profile_id
 
 
-async def test_step_2_query_construction(profile_id: UUID):
+async def step_2_query_construction(session: Session, profile_id: UUID):
     """Step 2: Test query construction from profile."""
     print_separator("STEP 2: Query Construction")
     
-    with session_scope() as session:
-        profile = profile_repository.get_by_id(session, profile_id)
-        
-        # Generate query
-        query = profile_to_query(profile)
-        print_success("Generated semantic query:")
-        print(f"  '{query}'")
-        
-        # Build filters
-        filters = build_metadata_filters(profile)
-        print_success("Generated metadata filters:")
-        for key, value in filters.items():
-            print(f"  {key}: {value}")
-        
-        return query, filters
+    profile = load_profile_snapshot(session, profile_id)
+    
+    # Generate query
+    query = profile_to_query(profile)
+    logger.info("✅ Generated semantic query:")
+    logger.info("  '%s'", query)
+    
+    # Build filters
+    filters = build_metadata_filters(profile)
+    logger.info("✅ Generated metadata filters:")
+    for key, value in filters.items():
+        logger.info("  %s: %s", key, value)
+    
+    return query, filters
 
 
-async def test_step_3_rag_retrieval(profile_id: UUID):
+async def step_3_rag_retrieval(session: Session, profile_id: UUID):
     """Step 3: Test RAG retrieval."""
     print_separator("STEP 3: RAG Retrieval (Semantic Search)")
     
-    with session_scope() as session:
-        profile = profile_repository.get_by_id(session, profile_id)
-        
-        # Test standard retrieval
-        print_info("Testing standard retrieval with filters...")
-        programs = await retrieve_relevant_programs(profile, top_k=3)
-        
-        if programs:
-            print_success(f"Retrieved {len(programs)} programs:")
-            for idx, program in enumerate(programs, 1):
-                print(f"\n  {idx}. {program.university} - {program.program_name}")
-                print(f"     Score: {program.score:.4f}")
-                print(f"     Tuition: {program.metadata.get('tuition_fee_mad', 'N/A')} MAD")
-                print(f"     Min GPA: {program.metadata.get('min_gpa', 'N/A')}")
-        else:
-            print_error("No programs retrieved with strict filters!")
-        
-        # Test fallback retrieval
-        print_info("\nTesting fallback retrieval strategy...")
-        programs_fallback, strategy = await retrieve_with_fallback(profile, top_k=3)
-        print_success(f"Fallback strategy used: {strategy}")
-        
-        if programs_fallback:
-            print_success(f"Retrieved {len(programs_fallback)} programs with fallback")
-            for idx, program in enumerate(programs_fallback, 1):
-                print(f"\n  {idx}. {program.university} - {program.program_name}")
-                print(f"     Score: {program.score:.4f}")
-            # Use fallback programs for next steps
-            return programs_fallback
-        else:
-            return programs
+    profile = load_profile_snapshot(session, profile_id)
+    
+    logger.info("ℹ️  Testing standard and fallback retrieval with filters...")
+    # Embed the query once and share it between both retrievals
+    query_text = enhance_query_with_context(profile_to_query(profile), profile)
+    [embedding] = await _bounded(embed_queries_batch([query_text]))
+    
+    # Run one after the other: the fallback temporarily clears the budget
+    # on the shared profile snapshot, which would leak into a concurrent
+    # standard retrieval
+    programs = await retrieve_relevant_programs(profile, top_k=3, embedding=embedding)
+    programs_fallback, strategy = await _bounded(
+        retrieve_with_fallback(profile, top_k=3, embedding=embedding)
+    )
+    
+    if programs:
+        logger.info(
+            "✅ Retrieved %s programs:\n%s",
+            len(programs),
+            "\n".join(
+                f"\n  {idx}. {program.university} - {program.program_name}"
+                f"\n     Score: {program.score:.4f}"
+                f"\n     Tuition: {program.metadata.get('tuition_fee_mad', 'N/A')} MAD"
+                f"\n     Min GPA: {program.metadata.get('min_gpa', 'N/A')}"
+                for idx, program in enumerate(programs, 1)
+            ),
+        )
+    else:
+        logger.error("❌ No programs retrieved with strict filters!")
+    
+    logger.info("✅ Fallback strategy used: %s", strategy)
+    
+    if programs_fallback:
+        logger.info(
+            "✅ Retrieved %s programs with fallback\n%s",
+            len(programs_fallback),
+            "\n".join(
+                f"\n  {idx}. {program.university} - {program.program_name}"
+                f"\n     Score: {program.score:.4f}"
+                for idx, program in enumerate(programs_fallback, 1)
+            ),
+        )
+        # Use fallback programs for next steps
+        return programs_fallback
+    else:
+        return programs
 
 
-async def test_step_4_prompt_generation(profile_id: UUID, programs):
+async def step_4_prompt_generation(session: Session, profile_id: UUID, programs):
     """Step 4: Test prompt generation."""
     print_separator("STEP 4: Prompt Generation")
     
-    with session_scope() as session:
-        profile = profile_repository.get_by_id(session, profile_id)
-        
-        # Generate prompts
-        user_prompt = create_user_prompt(profile, programs)
-        
-        print_success("System prompt generated:")
-        print(f"  Length: {len(SYSTEM_PROMPT)} characters")
-        print(f"  First 200 chars: {SYSTEM_PROMPT[:200]}...")
-        
-        print_success("\nUser prompt generated:")
-        print(f"  Length: {len(user_prompt)} characters")
-        print(f"  First 300 chars:")
-        print(f"  {user_prompt[:300]}...")
-        
-        return user_prompt
+    profile = load_profile_snapshot(session, profile_id)
+    
+    # Generate prompts
+    user_prompt = create_user_prompt(profile, programs)
+    
+    logger.info("✅ System prompt generated:")
+    logger.info("  Length: %s characters", len(SYSTEM_PROMPT))
+    logger.debug("  First 200 chars: %s", _preview(SYSTEM_PROMPT, 200))
+    
+    logger.info("\n✅ User prompt generated:")
+    logger.info("  Length: %s characters", len(user_prompt))
+    logger.debug("  First 300 chars:\n  %s", _preview(user_prompt, 300))
+    
+    return user_prompt
 
 
-async def test_step_5_generate_recommendation(profile_id: UUID):
-    """Step 5: Test full recommendation generation."""
+async def step_5_generate_recommendation(
+    profile_id: UUID,
+    service_task: Optional[asyncio.Task] = None,
+):
+    """
+    Step 5: Test full recommendation generation over the streaming path.
+    
+    service_task, when given, is a task already building the recommendation
+    service, so its construction overlaps the earlier steps.
+    """
     print_separator("STEP 5: Generate AI Recommendation")
     
-    print_info("Calling Mistral AI LLM to generate recommendation...")
-    print_info("This may take 10-30 seconds...")
+    logger.info("ℹ️  Streaming recommendation from Mistral AI LLM...")
     
     try:
-        service = get_recommendation_service()
-        recommendation = await service.generate_recommendation(
-            profile_id=profile_id,
-            top_k=5,
-            use_fallback=True
-        )
-        
-        print_success("Recommendation generated successfully!")
-        print(f"  Recommendation ID: {recommendation.id}")
-        print(f"  Query used: {recommendation.query[:100]}...")
-        print(f"  Response length: {len(recommendation.ai_response)} characters")
+        # Recommendations belong to a conversation session
+        with session_scope() as session:
+            user_id = session.execute(
+                select(Profile.user_id).where(Profile.id == profile_id)
+            ).scalar_one()
+            session_id = conversation_repository.create_session(
+                session,
+                user_id=user_id,
+                profile_id=profile_id,
+                title="Recommendation pipeline test",
+            ).id
+        
+        if service_task is not None:
+            service = await service_task
+        else:
+            service = await asyncio.to_thread(get_recommendation_service)
+        response = io.StringIO()
+        started = time.perf_counter()
+        first_token_after = None
+        
+        # Consume tokens as they arrive instead of blocking on the full reply
+        async with _MISTRAL_SEMAPHORE:
+            async for chunk in service.stream_recommendation(
+                profile_id=profile_id,
+                session_id=session_id,
+                top_k=5,
+                use_fallback=True
+            ):
+                if first_token_after is None:
+                    first_token_after = time.perf_counter() - started
+                    logger.info("ℹ️  First tokens after %.1fs", first_token_after)
+                response.write(chunk)
+        
+        # The stream saves the recommendation before it finishes
+        with session_scope() as session:
+            recommendation_id = session.execute(
+                select(Recommendation.id).where(Recommendation.session_id == session_id)
+            ).scalar_one()
+        
+        ai_response = response.getvalue()
+        logger.info("✅ Recommendation streamed in %.1fs!", time.perf_counter() - started)
+        logger.info("  Recommendation ID: %s", recommendation_id)
+        logger.info("  Response length: %s characters", len(ai_response))
         
         # Show first part of response
-        print_success("\nFirst 500 characters of AI response:")
-        print(f"  {recommendation.ai_response[:500]}...")
+        logger.debug("\n✅ First 500 characters of AI response:\n  %s", _preview(ai_response, 500))
         
         # Show structured data if available
-        if recommendation.structured_data:
-            print_success("\nStructured data extracted:")
-            for key, value in recommendation.structured_data.items():
-                print(f"  {key}: {value}")
+        structured_data = parse_json_from_response(ai_response)
+        if structured_data:
+            logger.info("\n✅ Structured data extracted:")
+            for key, value in structured_data.items():
+                logger.info("  %s: %s", key, value)
         
-        return recommendation
+        return recommendation_id
         
     except Exception as e:
-        print_error(f"Failed to generate recommendation: {str(e)}")
-        print(f"Error type: {type(e).__name__}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Failed to generate recommendation (%s): %s", type(e).__name__, e)
         return None
 
 
-async def test_step_6_retrieve_recommendation(recommendation_id: UUID):
+async def step_6_retrieve_recommendation(recommendation_id: UUID):
     """Step 6: Test recommendation retrieval."""
     print_separator("STEP 6: Retrieve Saved Recommendation")
     
     service = get_recommendation_service()
-    recommendation = service.get_recommendation_by_id(recommendation_id)
+    # Blocking DB read; run in a thread so it overlaps steps 7 and 8
+    recommendation = await asyncio.to_thread(
+        service.get_recommendation_by_id, recommendation_id
+    )
     
     if recommendation:
-        print_success("Successfully retrieved recommendation from database")
-        print(f"  ID: {recommendation.id}")
-        print(f"  Profile ID: {recommendation.profile_id}")
-        print(f"  Created at: {recommendation.created_at}")
-        print(f"  Retrieved {len(recommendation.retrieved_context or [])} programs in context")
+        logger.info("✅ Successfully retrieved recommendation from database")
+        logger.info("  ID: %s", recommendation.id)
+        logger.info("  Profile ID: %s", recommendation.profile_id)
+        logger.info("  Created at: %s", recommendation.created_at)
+        logger.info("  Retrieved %s programs in context", len(recommendation.retrieved_context or []))
         return True
     else:
-        print_error("Failed to retrieve recommendation")
+        logger.error("❌ Failed to retrieve recommendation")
         return False
 
 
-async def test_step_7_submit_feedback(recommendation_id: UUID):
+async def step_7_submit_feedback(recommendation_id: UUID):
     """Step 7: Test feedback submission."""
     print_separator("STEP 7: Submit Feedback")
     
     service = get_recommendation_service()
     
     try:
-        updated = service.submit_feedback(
+        updated = await asyncio.to_thread(
+            service.submit_feedback,
             recommendation_id=recommendation_id,
             rating=5,
             comment="This is an excellent recommendation! Very helpful and accurate."
         )
         
         if updated:
-            print_success("Feedback submitted successfully!")
-            print(f"  Rating: {updated.feedback_rating}/5")
-            print(f"  Comment: {updated.feedback_comment[:100]}...")
+            logger.info("✅ Feedback submitted successfully!")
+            logger.info("  Rating: %s/5", updated.feedback_rating)
+            logger.debug("  Comment: %s", _preview(updated.feedback_comment, 100))
             return True
         else:
-            print_error("Failed to submit feedback")
+            logger.error("❌ Failed to submit feedback")
             return False
             
     except Exception as e:
-        print_error(f"Feedback submission failed: {str(e)}")
+        logger.error("❌ Feedback submission failed: %s", e)
         return False
 
 
-async def test_step_8_list_profile_recommendations(profile_id: UUID):
+async def step_8_list_profile_recommendations(profile_id: UUID):
     """Step 8: Test listing all recommendations for a profile."""
     print_separator("STEP 8: List All Recommendations for Profile")
     
     service = get_recommendation_service()
-    recommendations = service.get_recommendations_by_profile(profile_id, limit=10)
+    recommendations = await asyncio.to_thread(
+        service.get_recommendations_by_profile, profile_id, limit=10
+    )
+    
+    # One record for the whole listing; previews only when DEBUG is on
+    with_preview = logger.isEnabledFor(logging.DEBUG)
+    logger.info(
+        "✅ Found %s recommendations for this profile:\n%s",
+        len(recommendations),
+        "\n".join(
+            f"\n  {idx}. ID: {rec.id}"
+            f"\n     Created: {rec.created_at}"
+            f"\n     Rating: {rec.feedback_rating or 'Not rated'}"
+            + (f"\n     Response preview: {_preview(rec.ai_response, 100)}" if with_preview else "")
+            for idx, rec in enumerate(recommendations, 1)
+        ),
+    )
     
-    print_success(f"Found {len(recommendations)} recommendations for this profile:")
-    for idx, rec in enumerate(recommendations, 1):
-        print(f"\n  {idx}. ID: {rec.id}")
-        print(f"     Created: {rec.created_at}")
-        print(f"     Rating: {rec.feedback_rating or 'Not rated'}")
-        print(f"     Response preview: {rec.ai_response[:100]}...")
+    return recommendations
+
+
+# The steps share a module-scoped event loop, so the fixtures below can
+# hand results from one step to the next; the module also shares the
+# application database with the other DB-backed modules
+pytestmark = [
+    pytest.mark.asyncio(loop_scope="module"),
+    pytest.mark.xdist_group("app_database"),
+]
+
+
+@pytest.fixture(scope="module")
+def pipeline_session():
+    """Read-only session shared by steps 1-4."""
+    with session_scope(readonly=True) as session:
+        yield session
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def retrieved_programs(pipeline_session, test_profile_id):
+    """Programs retrieved for the test profile in step 3."""
+    programs = await step_3_rag_retrieval(pipeline_session, test_profile_id)
+    if not programs:
+        pytest.skip("No programs retrieved; is the Pinecone index populated?")
+    return programs
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def recommendation_id(test_profile_id):
+    """Id of the recommendation generated for the test profile in step 5."""
+    recommendation_id = await step_5_generate_recommendation(test_profile_id)
+    assert recommendation_id is not None, "Recommendation generation failed"
+    return recommendation_id
+
+
+async def test_load_profile(pipeline_session, test_profile_id):
+    """Step 1 finds a profile to run the pipeline against."""
+    assert await step_1_load_profile(pipeline_session) is not None
+
+
+async def test_query_construction(pipeline_session, test_profile_id):
+    """Step 2 builds a non-empty query for the test profile."""
+    query, filters = await step_2_query_construction(pipeline_session, test_profile_id)
+    assert query
+
+
+async def test_rag_retrieval(retrieved_programs):
+    """Step 3 retrieves programs for the test profile."""
+    assert retrieved_programs
+
+
+async def test_prompt_generation(pipeline_session, test_profile_id, retrieved_programs):
+    """Step 4 builds the user prompt from the retrieved programs."""
+    user_prompt = await step_4_prompt_generation(
+        pipeline_session, test_profile_id, retrieved_programs
+    )
+    assert user_prompt
+
+
+async def test_generate_recommendation(recommendation_id):
+    """Step 5 streams and saves a recommendation."""
+    assert recommendation_id
+
+
+async def test_retrieve_recommendation(recommendation_id):
+    """Step 6 reads the saved recommendation back."""
+    assert await step_6_retrieve_recommendation(recommendation_id)
+
+
+async def test_submit_feedback(recommendation_id):
+    """Step 7 records feedback on the saved recommendation."""
+    assert await step_7_submit_feedback(recommendation_id)
+
+
+async def test_list_profile_recommendations(test_profile_id, recommendation_id):
+    """Step 8 lists the saved recommendation for the profile."""
+    assert await step_8_list_profile_recommendations(test_profile_id)
 
 
 async def main():
     """Run all tests in sequence."""
     print_separator("🚀 PHASE 4: AI RECOMMENDATION ENGINE - FULL PIPELINE TEST 🚀")
     
+    # Build the service (Mistral client) in a worker thread while steps 1-4
+    # run; step 5 awaits it instead of constructing it on first use
+    service_task = asyncio.create_task(asyncio.to_thread(get_recommendation_service))
+    
     try:
-        # Step 1: Load profile
-        profile_id = await test_step_1_load_profile()
-        if not profile_id:
-            print_error("Cannot continue without a profile. Exiting.")
-            return
-        
-        # Step 2: Query construction
-        query, filters = await test_step_2_query_construction(profile_id)
-        
-        # Step 3: RAG retrieval
-        programs = await test_step_3_rag_retrieval(profile_id)
-        if not programs:
-            print_error("No programs retrieved. Cannot continue to LLM generation.")
-            print_info("This might mean:")
-            print_info("  - No programs match the profile criteria")
-            print_info("  - Pinecone index is empty")
-            print_info("  - There's an issue with the retrieval service")
-            return
-        
-        # Step 4: Prompt generation
-        user_prompt = await test_step_4_prompt_generation(profile_id, programs)
+        # Steps 1-4 only read, so they share one read-only session
+        with session_scope(readonly=True) as session:
+            # Step 1: Load profile
+            profile_id = await step_1_load_profile(session)
+            if not profile_id:
+                logger.error("❌ Cannot continue without a profile. Exiting.")
+                return
+            
+            # Steps 2 and 3 only need the profile, so the local query
+            # construction runs while the RAG retrieval waits on Pinecone
+            async with asyncio.TaskGroup() as tg:
+                query_task = tg.create_task(step_2_query_construction(session, profile_id))
+                programs_task = tg.create_task(step_3_rag_retrieval(session, profile_id))
+            query, filters = query_task.result()
+            programs = programs_task.result()
+            if not programs:
+                logger.error("❌ No programs retrieved. Cannot continue to LLM generation.")
+                logger.info("ℹ️  This might mean:")
+                logger.info("ℹ️    - No programs match the profile criteria")
+                logger.info("ℹ️    - Pinecone index is empty")
+                logger.info("ℹ️    - There's an issue with the retrieval service")
+                return
+            
+            # Step 4: Prompt generation
+            user_prompt = await step_4_prompt_generation(session, profile_id, programs)
         
         # Step 5: Generate recommendation (LLM call)
-        recommendation = await test_step_5_generate_recommendation(profile_id)
-        if not recommendation:
-            print_error("Recommendation generation failed. Cannot continue.")
+        recommendation_id = await step_5_generate_recommendation(profile_id, service_task)
+        if not recommendation_id:
+            logger.error("❌ Recommendation generation failed. Cannot continue.")
             return
         
-        # Step 6: Retrieve recommendation
-        await test_step_6_retrieve_recommendation(recommendation.id)
-        
-        # Step 7: Submit feedback
-        await test_step_7_submit_feedback(recommendation.id)
-        
-        # Step 8: List all recommendations
-        await test_step_8_list_profile_recommendations(profile_id)
+        # Steps 6-8: retrieve, submit feedback and list are independent, and
+        # each runs in its own session, so they run concurrently. A failure
+        # in one is reported without cancelling the others.
+        results = await asyncio.gather(
+            step_6_retrieve_recommendation(recommendation_id),
+            step_7_submit_feedback(recommendation_id),
+            step_8_list_profile_recommendations(profile_id),
+            return_exceptions=True,
+        )
+        for step, result in enumerate(results, 6):
+            if isinstance(result, Exception):
+                logger.error("❌ Step %s failed: %s", step, result)
         
         print_separator("✅ ALL TESTS COMPLETED SUCCESSFULLY! ✅")
-        print_success("Phase 4 implementation is working end-to-end!")
-        print_info("\nNext steps:")
-        print_info("  1. Test the API endpoints directly (POST /api/recommendations/generate)")
-        print_info("  2. Test streaming endpoint (GET /api/recommendations/stream/{profile_id})")
-        print_info("  3. Build frontend UI (Phase 5)")
+        logger.info("✅ Phase 4 implementation is working end-to-end!")
+        logger.info("\nℹ️  Next steps:")
+        logger.info("ℹ️    1. Test the API endpoints directly (POST /api/recommendations/generate)")
+        logger.info("ℹ️    2. Test streaming endpoint (GET /api/recommendations/stream/{profile_id})")
+        logger.info("ℹ️    3. Build frontend UI (Phase 5)")
         
     except KeyboardInterrupt:
-        print_error("\n\nTest interrupted by user")
+        logger.error("\n\n❌ Test interrupted by user")
         sys.exit(1)
     except Exception as e:
-        print_error(f"\n\nUnexpected error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("\n\n❌ Unexpected error: %s", e)
         sys.exit(1)
 
 
 if __name__ == "__main__":
+    VERBOSE = VERBOSE or "--verbose" in sys.argv[1:]
+    logging.basicConfig(level=logging.DEBUG if VERBOSE else logging.INFO, format="%(message)s")
     asyncio.run(main())
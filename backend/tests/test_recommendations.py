@@ -9,215 +9,129 @@ This script tests the complete recommendation pipeline end-to-end:
 5. Verify storage and retrieval
 """
 
-import asyncio
-import os
 import pytest
-from uuid import uuid4
+
+from app.core.config import get_settings
+
+# These are integration tests against the live Mistral and Pinecone APIs;
+# skip before the imports below pull in the RAG/LLM service stack
+_settings = get_settings()
+if not (_settings.mistral_api_key and _settings.pinecone_api_key):
+    pytest.skip("Integration tests require external API setup", allow_module_level=True)
+
+import asyncio
+import json
+import traceback
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
 from app.db import session_scope
-from app.models.user import User
-from app.models.profile import Profile, AcademicRecord, StudentPreferences, SubjectGrade
+from app.models.profile import Profile
+from app.repositories import conversation_repository
 from app.services.query_service import profile_to_query, build_metadata_filters
 from app.services.rag_service import retrieve_relevant_programs
 from app.services.recommendation_service import get_recommendation_service
+from conftest import RECOMMENDATION_PROFILE_NAME, create_test_profile, load_profile_snapshot
 
-# Skip these tests if external API keys are not configured
-pytestmark = pytest.mark.skipif(
-    not os.getenv("MISTRAL_API_KEY") or not os.getenv("PINECONE_API_KEY"),
-    reason="External API keys (MISTRAL_API_KEY, PINECONE_API_KEY) not configured for testing"
-)
-
-
-# These are integration tests - skip at module level
-pytest.skip("Integration tests require external API setup", allow_module_level=True)
 
-
-def create_test_profile():
-    """Create a test student profile for recommendation testing."""
-    print("\n" + "="*80)
-    print("STEP 1: Creating test student profile...")
-    print("="*80)
-    
-    with session_scope() as db:
-        # Check if test user exists
-        test_user = db.query(User).filter(User.email == "test@sira.ma").first()
-        
-        if not test_user:
-            test_user = User(
-                id=uuid4(),
-                clerk_user_id="test_clerk_123",
-                email="test@sira.ma"
-            )
-            db.add(test_user)
-            db.commit()
-            print(f"✅ Created test user: {test_user.email}")
-        else:
-            print(f"✅ Using existing test user: {test_user.email}")
-        
-        # Create profile
-        profile = Profile(
-            id=uuid4(),
-            user_id=test_user.id,
-            profile_name="Computer Science Track - Test",
-            status="active"
-        )
-        db.add(profile)
-        db.flush()
-        
-        # Academic record
-        academic_record = AcademicRecord(
-            id=uuid4(),
-            profile_id=profile.id,
-            current_status="high_school",
-            current_institution="Lycée Mohammed V",
-            current_field="Science Mathématiques B",
-            gpa=16.5,
-            language_preference="French"
-        )
-        db.add(academic_record)
-        db.flush()
-        
-        # Subject grades
-        subjects = [
-            ("Mathématiques", 18.0),
-            ("Physique-Chimie", 17.5),
-            ("Sciences de l'Ingénieur", 16.0),
-            ("Informatique", 19.0),
-            ("Français", 14.0),
-            ("Anglais", 15.5)
-        ]
-        
-        for subject_name, grade in subjects:
-            subject_grade = SubjectGrade(
-                id=uuid4(),
-                academic_record_id=academic_record.id,
-                subject_name=subject_name,
-                grade=grade,
-                weight=1.0
-            )
-            db.add(subject_grade)
-        
-        # Student preferences
-        preferences = StudentPreferences(
-            id=uuid4(),
-            profile_id=profile.id,
-            favorite_subjects=["Computer Science", "Mathematics", "Artificial Intelligence"],
-            disliked_subjects=["Biology", "Literature"],
-            soft_skills=["Problem Solving", "Teamwork", "Critical Thinking"],
-            hobbies=["Programming", "Gaming", "Robotics"],
-            geographic_preference="Morocco",
-            budget_range_min=20000,
-            budget_range_max=60000,
-            career_goals="Software Engineer or Data Scientist specializing in AI"
-        )
-        db.add(preferences)
-        
-        db.commit()
-        db.refresh(profile)
-        
-        print(f"\n✅ Created test profile: {profile.profile_name}")
-        print(f"   Profile ID: {profile.id}")
-        print(f"   GPA: {academic_record.gpa}/20")
-        print(f"   Budget: {preferences.budget_range_min}-{preferences.budget_range_max} MAD")
-        print(f"   Interests: {', '.join(preferences.favorite_subjects)}")
-        
-        return profile.id
+# Shares the application database with the other DB-backed modules
+pytestmark = pytest.mark.xdist_group("app_database")
 
 
-async def test_query_construction(profile_id):
+async def check_query_construction(db: Session, profile_id):
     """Test query generation from profile."""
     print("\n" + "="*80)
     print("STEP 2: Testing query construction...")
     print("="*80)
     
-    with session_scope() as db:
-        from app.repositories import profile_repository
-        profile = profile_repository.get_by_id(db, profile_id)
-        db.refresh(profile)
-        
-        # Generate query
-        query = profile_to_query(profile)
-        print(f"\n✅ Generated query:")
-        print(f"   '{query}'")
-        
-        # Build filters
-        filters = build_metadata_filters(profile)
-        print(f"\n✅ Generated filters:")
-        for key, value in filters.items():
-            print(f"   {key}: {value}")
-        
-        return query, filters
+    profile = load_profile_snapshot(db, profile_id)
+    
+    # Generate query
+    query = profile_to_query(profile)
+    print(f"\n✅ Generated query:")
+    print(f"   '{query}'")
+    
+    # Build filters
+    filters = build_metadata_filters(profile)
+    print(f"\n✅ Generated filters:")
+    for key, value in filters.items():
+        print(f"   {key}: {value}")
+    
+    return query, filters
 
 
-async def test_rag_retrieval(profile_id):
+async def check_rag_retrieval(db: Session, profile_id):
     """Test RAG retrieval."""
     print("\n" + "="*80)
     print("STEP 3: Testing RAG retrieval...")
     print("="*80)
     
-    with session_scope() as db:
-        from app.repositories import profile_repository
-        profile = profile_repository.get_by_id(db, profile_id)
-        db.refresh(profile)
-        
-        # Retrieve programs
-        programs = await retrieve_relevant_programs(profile, top_k=5)
-        
-        print(f"\n✅ Retrieved {len(programs)} programs:")
-        for idx, program in enumerate(programs, 1):
-            print(f"\n   {idx}. {program.university} - {program.program_name}")
-            print(f"      Score: {program.score:.4f}")
-            if program.metadata:
-                if "tuition_fee_mad" in program.metadata:
-                    print(f"      Tuition: {program.metadata['tuition_fee_mad']} MAD")
-                if "min_gpa" in program.metadata:
-                    print(f"      Min GPA: {program.metadata['min_gpa']}/20")
-                if "language" in program.metadata:
-                    print(f"      Language: {program.metadata['language']}")
-        
-        return programs
+    profile = load_profile_snapshot(db, profile_id)
+    
+    # Retrieve programs
+    programs = await retrieve_relevant_programs(profile, top_k=5)
+    
+    print(f"\n✅ Retrieved {len(programs)} programs:")
+    for idx, program in enumerate(programs, 1):
+        print(f"\n   {idx}. {program.university} - {program.program_name}")
+        print(f"      Score: {program.score:.4f}")
+        if program.metadata:
+            if "tuition_fee_mad" in program.metadata:
+                print(f"      Tuition: {program.metadata['tuition_fee_mad']} MAD")
+            if "min_gpa" in program.metadata:
+                print(f"      Min GPA: {program.metadata['min_gpa']}/20")
+            if "language" in program.metadata:
+                print(f"      Language: {program.metadata['language']}")
+    
+    return programs
 
 
-async def test_recommendation_generation(profile_id):
+async def check_recommendation_generation(profile_id):
     """Test full recommendation generation."""
     print("\n" + "="*80)
     print("STEP 4: Generating AI recommendation...")
     print("="*80)
     print("⏳ This may take 10-30 seconds...")
     
+    # Recommendations belong to a conversation session
+    with session_scope() as db:
+        user_id = db.execute(
+            select(Profile.user_id).where(Profile.id == profile_id)
+        ).scalar_one()
+        session_id = conversation_repository.create_session(
+            db,
+            user_id=user_id,
+            profile_id=profile_id,
+            title="Recommendation engine test",
+        ).id
+    
     service = get_recommendation_service()
+    recommendation = await service.generate_recommendation(
+        profile_id=profile_id,
+        session_id=session_id,
+        top_k=5,
+        use_fallback=True
+    )
     
-    try:
-        recommendation = await service.generate_recommendation(
-            profile_id=profile_id,
-            top_k=5,
-            use_fallback=True
-        )
-        
-        print(f"\n✅ Recommendation generated successfully!")
-        print(f"   Recommendation ID: {recommendation.id}")
-        print(f"   Query: {recommendation.query}")
-        print(f"   Retrieved {len(recommendation.retrieved_context)} programs")
-        
-        print(f"\n📄 AI Response:")
-        print("="*80)
-        print(recommendation.ai_response)
-        print("="*80)
-        
-        if recommendation.structured_data:
-            print(f"\n📊 Structured Data:")
-            import json
-            print(json.dumps(recommendation.structured_data, indent=2))
-        
-        return recommendation.id
+    print(f"\n✅ Recommendation generated successfully!")
+    print(f"   Recommendation ID: {recommendation.id}")
+    print(f"   Query: {recommendation.query}")
+    print(f"   Retrieved {len(recommendation.retrieved_context)} programs")
     
-    except Exception as e:
-        print(f"\n❌ Error generating recommendation: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
+    print(f"\n📄 AI Response:")
+    print("="*80)
+    print(recommendation.ai_response)
+    print("="*80)
+    
+    if recommendation.structured_data:
+        print(f"\n📊 Structured Data:")
+        print(json.dumps(recommendation.structured_data, indent=2))
+    
+    return recommendation.id
 
 
-async def test_recommendation_retrieval(recommendation_id):
+async def check_recommendation_retrieval(recommendation_id):
     """Test retrieving saved recommendation."""
     print("\n" + "="*80)
     print("STEP 5: Testing recommendation retrieval...")
@@ -236,75 +150,85 @@ async def test_recommendation_retrieval(recommendation_id):
         return False
 
 
-async def test_feedback(recommendation_id):
+async def check_feedback(recommendation_id):
     """Test feedback submission."""
     print("\n" + "="*80)
     print("STEP 6: Testing feedback submission...")
     print("="*80)
     
     service = get_recommendation_service()
+    updated = service.submit_feedback(
+        recommendation_id=recommendation_id,
+        rating=5,
+        comment="Excellent recommendations! Very helpful and accurate."
+    )
     
-    try:
-        updated = service.submit_feedback(
-            recommendation_id=recommendation_id,
-            rating=5,
-            comment="Excellent recommendations! Very helpful and accurate."
-        )
-        
-        print(f"✅ Feedback submitted successfully")
-        print(f"   Rating: {updated.feedback_rating}/5")
-        print(f"   Comment: {updated.feedback_comment}")
-        return True
-    
-    except Exception as e:
-        print(f"❌ Failed to submit feedback: {str(e)}")
-        return False
+    print(f"✅ Feedback submitted successfully")
+    print(f"   Rating: {updated.feedback_rating}/5")
+    print(f"   Comment: {updated.feedback_comment}")
+    return updated
 
 
-async def main():
-    """Run all tests."""
+async def test_pipeline(test_profile_id):
+    """Run the recommendation pipeline against the session's test profile."""
     print("\n" + "="*80)
     print("🚀 PHASE 4 RECOMMENDATION ENGINE TEST SUITE")
     print("="*80)
     
+    # Steps 2-3 share one session instead of opening one each
+    with session_scope() as db:
+        # Steps 2 and 3: query construction overlaps the RAG retrieval
+        (query, filters), programs = await asyncio.gather(
+            check_query_construction(db, test_profile_id),
+            check_rag_retrieval(db, test_profile_id),
+        )
+    assert query
+    assert programs, "No programs retrieved for the test profile"
+    
+    # Step 4: Generate recommendation
+    recommendation_id = await check_recommendation_generation(test_profile_id)
+    assert recommendation_id is not None
+    
+    # Step 5: Test retrieval
+    assert await check_recommendation_retrieval(recommendation_id)
+    
+    # Step 6: Test feedback
+    updated = await check_feedback(recommendation_id)
+    assert updated.id == recommendation_id
+    assert updated.feedback_rating == 5
+    
+    print("\n" + "="*80)
+    print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+    print("="*80)
+    print("\nPhase 4 implementation verified:")
+    print("  ✅ Database schema (recommendations table)")
+    print("  ✅ Query construction from profile")
+    print("  ✅ RAG retrieval with filters")
+    print("  ✅ LLM recommendation generation")
+    print("  ✅ Recommendation storage")
+    print("  ✅ Feedback system")
+    print("\nNext steps:")
+    print("  - Test streaming endpoint manually")
+    print("  - Build frontend recommendation UI (Phase 5)")
+    print("  - Add visualization components (Phase 6)")
+
+
+async def main():
+    """Create a test profile and run the pipeline outside pytest."""
     try:
         # Step 1: Create test profile
-        profile_id = create_test_profile()
-        
-        # Step 2: Test query construction
-        await test_query_construction(profile_id)
-        
-        # Step 3: Test RAG retrieval
-        await test_rag_retrieval(profile_id)
-        
-        # Step 4: Generate recommendation
-        recommendation_id = await test_recommendation_generation(profile_id)
-        
-        if recommendation_id:
-            # Step 5: Test retrieval
-            await test_recommendation_retrieval(recommendation_id)
-            
-            # Step 6: Test feedback
-            await test_feedback(recommendation_id)
-        
         print("\n" + "="*80)
-        print("✅ ALL TESTS COMPLETED SUCCESSFULLY!")
+        print("STEP 1: Creating test student profile...")
         print("="*80)
-        print("\nPhase 4 implementation verified:")
-        print("  ✅ Database schema (recommendations table)")
-        print("  ✅ Query construction from profile")
-        print("  ✅ RAG retrieval with filters")
-        print("  ✅ LLM recommendation generation")
-        print("  ✅ Recommendation storage")
-        print("  ✅ Feedback system")
-        print("\nNext steps:")
-        print("  - Test streaming endpoint manually")
-        print("  - Build frontend recommendation UI (Phase 5)")
-        print("  - Add visualization components (Phase 6)")
+        with session_scope() as db:
+            profile_id = create_test_profile(db)
+        print(f"\n✅ Created test profile: {RECOMMENDATION_PROFILE_NAME}")
+        print(f"   Profile ID: {profile_id}")
         
+        await test_pipeline(profile_id)
+    
     except Exception as e:
         print(f"\n❌ Test suite failed: {str(e)}")
-        import traceback
         traceback.print_exc()
 
 
@@ -11,54 +11,138 @@ Tests cover:
 """
 import pytest
 from uuid import uuid4
-from sqlalchemy.orm import Session
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
 
 from app.models.user import User
 from app.models.profile import Profile
 from app.models.conversation import ConversationSession, ConversationMessage
 from app.models.recommendation import Recommendation
-from app.db import Base, get_engine, session_scope
+
+
+def persist(session: Session, *objects) -> None:
+    """Add objects and flush them, so their ids are assigned without a commit."""
+    session.add_all(objects)
+    session.flush()
+
+
+class QueryCounter:
+    """Record the statements sent on a connection, to bound query counts."""
+    
+    def __init__(self):
+        self.statements = []
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def mark(self) -> int:
+        """Return a position to count later statements from."""
+        return len(self.statements)
+    
+    def count_since(self, mark: int) -> int:
+        """Return how many statements ran after the given mark."""
+        return len(self.statements) - mark
+
+
+@pytest.fixture(scope="module")
+def connection(test_engine):
+    """
+    Open one connection per module inside an outer transaction.
+    
+    The tests exercise ORM mappings and cascades only, so they run on the
+    in-memory SQLite test engine. Foreign keys are enforced on it so ON
+    DELETE CASCADE / SET NULL behave as on Postgres; SQLite ignores the
+    pragma inside a transaction, so it is set before the outer BEGIN and
+    cleared again for the next module sharing the connection.
+    
+    Rolling the outer transaction back at teardown discards the module's
+    rows, including the module-scoped user and profile.
+    """
+    connection = test_engine.connect()
+    dbapi_connection = connection.connection.dbapi_connection
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+    transaction = connection.begin()
+    try:
+        yield connection
+    finally:
+        transaction.rollback()
+        dbapi_connection.execute("PRAGMA foreign_keys=OFF")
+        connection.close()
+
+
+@pytest.fixture(scope="module")
+def module_session(connection):
+    """Session owning the module-scoped rows; they stay loaded after commit."""
+    with Session(
+        bind=connection,
+        join_transaction_mode="create_savepoint",
+        expire_on_commit=False,
+    ) as session:
+        yield session
 
 
 @pytest.fixture(scope="function")
-def db_session():
-    """Create a fresh database session for each test."""
-    engine = get_engine()
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+def db_session(connection):
+    """
+    Create a database session for each test inside a SAVEPOINT.
     
-    # Use session_scope to get a session
-    with session_scope() as session:
+    The session joins in SAVEPOINT mode as well, so tests may call commit()
+    freely; rolling back the per-test SAVEPOINT discards it all.
+    """
+    savepoint = connection.begin_nested()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
         yield session
-        
-        # Cleanup is handled by the context manager
+    finally:
+        session.close()
+        if savepoint.is_active:
+            savepoint.rollback()
 
 
 @pytest.fixture
-def test_user(db_session: Session):
-    """Create a test user."""
+def query_counter(connection):
+    """Count the statements each test sends, to catch lazy-load regressions."""
+    counter = QueryCounter()
+    event.listen(connection, "before_cursor_execute", counter)
+    yield counter
+    event.remove(connection, "before_cursor_execute", counter)
+
+
+@pytest.fixture(scope="module")
+def test_user(module_session: Session):
+    """Create the test user shared by every test in this module."""
     user = User(
         clerk_user_id=f"clerk_test_{uuid4()}",
         email="test@example.com"
     )
-    db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    module_session.add(user)
+    module_session.commit()
     return user
 
 
+@pytest.fixture(scope="module")
+def test_profile(module_session: Session, test_user: User):
+    """Create the test profile shared by the tests that do not modify it."""
+    profile = Profile(
+        user_id=test_user.id,
+        profile_name="Computer Science Track",
+        status="active"
+    )
+    module_session.add(profile)
+    module_session.commit()
+    return profile
+
+
 @pytest.fixture
-def test_profile(db_session: Session, test_user: User):
-    """Create a test profile."""
+def fresh_profile(db_session: Session, test_user: User):
+    """Create a profile for a single test, for tests that delete it."""
     profile = Profile(
         user_id=test_user.id,
         profile_name="Computer Science Track",
         status="active"
     )
-    db_session.add(profile)
-    db_session.commit()
-    db_session.refresh(profile)
+    persist(db_session, profile)
     return profile
 
 
@@ -73,9 +157,7 @@ class TestChatWithoutProfile:
             title="General Chat",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
-        db_session.refresh(session)
+        persist(db_session, session)
         
         assert session.id is not None
         assert session.profile_id is None
@@ -90,8 +172,7 @@ class TestChatWithoutProfile:
             title="General Chat",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Add user message
         user_msg = ConversationMessage(
@@ -99,7 +180,6 @@ class TestChatWithoutProfile:
             role="user",
             content="Hello, I'm interested in graduate programs."
         )
-        db_session.add(user_msg)
         
         # Add assistant message
         assistant_msg = ConversationMessage(
@@ -107,8 +187,7 @@ class TestChatWithoutProfile:
             role="assistant",
             content="I'd be happy to help! To provide the best recommendations, please create a profile."
         )
-        db_session.add(assistant_msg)
-        db_session.commit()
+        persist(db_session, user_msg, assistant_msg)
         
         # Verify messages
         messages = db_session.query(ConversationMessage).filter(
@@ -124,7 +203,13 @@ class TestChatWithoutProfile:
 class TestChatWithProfile:
     """Test creating chats with a profile from the start."""
     
-    def test_create_session_with_profile(self, db_session: Session, test_user: User, test_profile: Profile):
+    def test_create_session_with_profile(
+        self,
+        db_session: Session,
+        test_user: User,
+        test_profile: Profile,
+        query_counter: QueryCounter,
+    ):
         """Test creating a chat session with a profile."""
         session = ConversationSession(
             user_id=test_user.id,
@@ -132,13 +217,20 @@ class TestChatWithProfile:
             title="CS Track Consultation",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
-        db_session.refresh(session)
+        persist(db_session, session)
         
         assert session.id is not None
         assert session.profile_id == test_profile.id
-        assert session.profile.profile_name == "Computer Science Track"
+        
+        # Eager-loaded, the profile must not cost another query on access
+        loaded = db_session.execute(
+            select(ConversationSession)
+            .options(selectinload(ConversationSession.profile))
+            .where(ConversationSession.id == session.id)
+        ).scalar_one()
+        mark = query_counter.mark()
+        assert loaded.profile.profile_name == "Computer Science Track"
+        assert query_counter.count_since(mark) == 0
         print("✓ Chat session created with profile")
     
     def test_one_chat_one_profile_constraint(self, db_session: Session, test_user: User, test_profile: Profile):
@@ -149,8 +241,7 @@ class TestChatWithProfile:
             title="CS Track",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Try to create another profile for the same user
         profile2 = Profile(
@@ -158,13 +249,13 @@ class TestChatWithProfile:
             profile_name="Medicine Track",
             status="active"
         )
-        db_session.add(profile2)
-        db_session.commit()
+        persist(db_session, profile2)
         
         # Update session to another profile (should work - we allow changing the profile)
         session.profile_id = profile2.id
-        db_session.commit()
-        db_session.refresh(session)
+        db_session.flush()
+        # Only the relationship is stale; reload just that on next access
+        db_session.expire(session, ["profile"])
         
         assert session.profile_id == profile2.id
         assert session.profile.profile_name == "Medicine Track"
@@ -183,16 +274,16 @@ class TestAppendingProfile:
             title="General Chat",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Verify no profile
         assert session.profile_id is None
         
         # Append profile
         session.profile_id = test_profile.id
-        db_session.commit()
-        db_session.refresh(session)
+        db_session.flush()
+        # Only the relationship is stale; reload just that on next access
+        db_session.expire(session, ["profile"])
         
         # Verify profile appended
         assert session.profile_id == test_profile.id
@@ -212,8 +303,7 @@ class TestRecommendations:
             title="CS Track",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Create recommendation with both profile and session
         recommendation = Recommendation(
@@ -223,9 +313,7 @@ class TestRecommendations:
             ai_response="Here are some recommendations...",
             structured_data={"programs": ["MIT", "Stanford"]}
         )
-        db_session.add(recommendation)
-        db_session.commit()
-        db_session.refresh(recommendation)
+        persist(db_session, recommendation)
         
         assert recommendation.profile_id == test_profile.id
         assert recommendation.session_id == session.id
@@ -243,87 +331,53 @@ class TestRecommendations:
         db_session.add(recommendation)
         
         with pytest.raises(IntegrityError):
-            db_session.commit()
+            db_session.flush()
         
         db_session.rollback()
         print("✓ Recommendation without session_id fails (as expected)")
     
-    def test_one_profile_multiple_recommendations(self, db_session: Session, test_user: User, test_profile: Profile):
-        """Test that one profile can have multiple recommendations."""
-        # Create multiple sessions
-        session1 = ConversationSession(
-            user_id=test_user.id,
-            profile_id=test_profile.id,
-            title="Session 1",
-            status="active"
-        )
-        session2 = ConversationSession(
-            user_id=test_user.id,
-            profile_id=test_profile.id,
-            title="Session 2",
-            status="active"
-        )
-        db_session.add_all([session1, session2])
-        db_session.commit()
-        
-        # Create multiple recommendations for the same profile
-        rec1 = Recommendation(
-            profile_id=test_profile.id,
-            session_id=session1.id,
-            query="Query 1",
-            ai_response="Response 1"
-        )
-        rec2 = Recommendation(
-            profile_id=test_profile.id,
-            session_id=session2.id,
-            query="Query 2",
-            ai_response="Response 2"
-        )
-        db_session.add_all([rec1, rec2])
-        db_session.commit()
-        
-        # Verify both recommendations exist
-        recommendations = db_session.query(Recommendation).filter(
-            Recommendation.profile_id == test_profile.id
-        ).all()
-        
-        assert len(recommendations) == 2
-        print("✓ One profile can have multiple recommendations")
-    
-    def test_one_session_multiple_recommendations(self, db_session: Session, test_user: User, test_profile: Profile):
-        """Test that one session can have multiple recommendations."""
-        session = ConversationSession(
-            user_id=test_user.id,
-            profile_id=test_profile.id,
-            title="Session",
-            status="active"
-        )
-        db_session.add(session)
-        db_session.commit()
-        
-        # Create multiple recommendations for the same session
-        rec1 = Recommendation(
-            profile_id=test_profile.id,
-            session_id=session.id,
-            query="Query 1",
-            ai_response="Response 1"
-        )
-        rec2 = Recommendation(
-            profile_id=test_profile.id,
-            session_id=session.id,
-            query="Query 2",
-            ai_response="Response 2"
-        )
-        db_session.add_all([rec1, rec2])
-        db_session.commit()
+    @pytest.mark.parametrize("group_by", ["profile", "session"])
+    def test_multiple_recommendations(
+        self,
+        db_session: Session,
+        test_user: User,
+        test_profile: Profile,
+        group_by: str,
+    ):
+        """Test that one profile, or one session, can have multiple recommendations."""
+        # One session per recommendation when grouping by profile, one
+        # shared session when grouping by session
+        sessions = [
+            ConversationSession(
+                user_id=test_user.id,
+                profile_id=test_profile.id,
+                title=f"Session {n}",
+                status="active"
+            )
+            for n in range(1, 3 if group_by == "profile" else 2)
+        ]
+        persist(db_session, *sessions)
+        
+        # Create both recommendations in one INSERT
+        db_session.execute(insert(Recommendation), [
+            {
+                "profile_id": test_profile.id,
+                "session_id": sessions[n % len(sessions)].id,
+                "query": f"Query {n + 1}",
+                "ai_response": f"Response {n + 1}"
+            }
+            for n in range(2)
+        ])
         
         # Verify both recommendations exist
-        recommendations = db_session.query(Recommendation).filter(
-            Recommendation.session_id == session.id
-        ).all()
+        if group_by == "profile":
+            criterion = Recommendation.profile_id == test_profile.id
+        else:
+            criterion = Recommendation.session_id == sessions[0].id
+        recommendations = db_session.query(Recommendation).filter(criterion).all()
         
         assert len(recommendations) == 2
-        print("✓ One session can have multiple recommendations")
+        print(f"✓ One {group_by} can have multiple recommendations")
 
 
 class TestCascadeDeletions:
@@ -337,8 +391,7 @@ class TestCascadeDeletions:
             title="Test Session",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Add messages
         msg = ConversationMessage(
@@ -346,14 +399,13 @@ class TestCascadeDeletions:
             role="user",
             content="Test message"
         )
-        db_session.add(msg)
-        db_session.commit()
+        persist(db_session, msg)
         
         session_id = session.id
         
         # Delete session
         db_session.delete(session)
-        db_session.commit()
+        db_session.flush()
         
         # Verify messages are deleted (CASCADE)
         messages = db_session.query(ConversationMessage).filter(
@@ -371,8 +423,7 @@ class TestCascadeDeletions:
             title="Test Session",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Add recommendation
         rec = Recommendation(
@@ -381,14 +432,13 @@ class TestCascadeDeletions:
             query="Test query",
             ai_response="Test response"
         )
-        db_session.add(rec)
-        db_session.commit()
+        persist(db_session, rec)
         
         session_id = session.id
         
         # Delete session
         db_session.delete(session)
-        db_session.commit()
+        db_session.flush()
         
         # Verify recommendations are deleted (CASCADE)
         recommendations = db_session.query(Recommendation).filter(
@@ -398,22 +448,21 @@ class TestCascadeDeletions:
         assert len(recommendations) == 0
         print("✓ Deleting session cascades to recommendations")
     
-    def test_delete_profile_sets_session_profile_null(self, db_session: Session, test_user: User, test_profile: Profile):
+    def test_delete_profile_sets_session_profile_null(self, db_session: Session, test_user: User, fresh_profile: Profile):
         """Test that deleting a profile sets session.profile_id to NULL (SET NULL behavior)."""
         session = ConversationSession(
             user_id=test_user.id,
-            profile_id=test_profile.id,
+            profile_id=fresh_profile.id,
             title="Test Session",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         session_id = session.id
         
         # Delete profile
-        db_session.delete(test_profile)
-        db_session.commit()
+        db_session.delete(fresh_profile)
+        db_session.flush()
         
         # Expire all objects to force reload from database
         db_session.expire_all()
@@ -427,32 +476,30 @@ class TestCascadeDeletions:
         assert session.profile_id is None, "Session profile_id should be NULL after profile deletion"
         print("✓ Deleting profile sets session.profile_id to NULL")
     
-    def test_delete_profile_deletes_recommendations(self, db_session: Session, test_user: User, test_profile: Profile):
+    def test_delete_profile_deletes_recommendations(self, db_session: Session, test_user: User, fresh_profile: Profile):
         """Test that deleting a profile cascades to its recommendations."""
         session = ConversationSession(
             user_id=test_user.id,
-            profile_id=test_profile.id,
+            profile_id=fresh_profile.id,
             title="Test Session",
             status="active"
         )
-        db_session.add(session)
-        db_session.commit()
+        persist(db_session, session)
         
         # Add recommendation
         rec = Recommendation(
-            profile_id=test_profile.id,
+            profile_id=fresh_profile.id,
             session_id=session.id,
             query="Test query",
             ai_response="Test response"
         )
-        db_session.add(rec)
-        db_session.commit()
+        persist(db_session, rec)
         
-        profile_id = test_profile.id
+        profile_id = fresh_profile.id
         
         # Delete profile
-        db_session.delete(test_profile)
-        db_session.commit()
+        db_session.delete(fresh_profile)
+        db_session.flush()
         
         # Verify recommendations are deleted (CASCADE)
         recommendations = db_session.query(Recommendation).filter(
@@ -18,14 +18,18 @@ from app.schemas.conversation import SessionCreate, SessionUpdate
 from app.schemas.recommendation import RecommendationCreate
 from app.services.conversation_service import ConversationService
 from app.services.recommendation_service import RecommendationService
-from app.db import Base, get_engine, session_scope
+from app.db import ensure_schema, get_engine, session_scope
+
+
+# Shares the application database with the other DB-backed modules
+pytestmark = pytest.mark.xdist_group("app_database")
 
 
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database session for each test."""
     engine = get_engine()
-    Base.metadata.create_all(bind=engine)
+    ensure_schema(engine)
     with session_scope() as session:
         yield session
 
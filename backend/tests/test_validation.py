@@ -280,3 +280,13 @@ class TestSanitizeDict:
         }
         result = sanitize_dict(data, max_string_length=100)
         assert len(result["long_text"]) == 100
+
+    def test_sanitize_deeply_nested_dict(self):
+        """Test deeply nested dicts do not hit the recursion limit."""
+        data: dict = {}
+        node = data
+        for _ in range(5000):
+            node["child"] = {"name": "  leaf  "}
+            node = node["child"]
+        result = sanitize_dict(data)
+        assert result["child"]["child"]["name"] == "leaf"